@@ -4,6 +4,15 @@ from const import *
 from game import Game
 from square import Square
 from move import Move
+from renderer import Renderer
+
+# Mensagens de empate por motivo de fim de jogo (GameState.termination)
+DRAW_MESSAGES = {
+    'stalemate': 'Empate por afogamento!',
+    'threefold': 'Empate por repetição!',
+    'fifty-move': 'Empate pela regra dos 50 lances!',
+    'insufficient': 'Empate por material insuficiente!',
+}
 
 class Main:
     """
@@ -16,63 +25,67 @@ class Main:
         """
         pygame.init()
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption('Chess')
+        self.caption = 'Chess'
+        pygame.display.set_caption(self.caption)
         self.game = Game()
-
-    def _blit_all(self):
-        """
-        Função auxiliar para redesenhar todos os elementos do jogo na tela.
-        """
-        self.game.show_bg(self.screen)
-        self.game.show_last_move(self.screen)
-        self.game.show_moves(self.screen)
-        self.game.show_pieces(self.screen)
-        self.game.show_hover(self.screen)
-        if self.game.dragger.dragging:
-            self.game.dragger.update_blit(self.screen)
-        
-        # Mostra a tela de fim de jogo se o jogo tiver terminado
-        if self.game.game_over:
-            self.show_game_over()
-        
-        pygame.display.update()
+        self.renderer = Renderer(self.game, overlay=lambda surface: self.show_game_over())
+        self.clock = pygame.time.Clock()
 
     def show_game_over(self):
         """
         Exibe a mensagem de fim de jogo na tela.
         """
-        font = pygame.font.SysFont('monospace', 50, bold=True)
         if self.game.winner:
             text = f'Xeque-mate! {self.game.winner.capitalize()} venceu!'
         else:
-            text = 'Empate por afogamento!'
+            text = DRAW_MESSAGES.get(self.game.termination, 'Empate!')
         
-        lbl = font.render(text, True, (255, 0, 0))
+        lbl = self.game.assets.label(text, (255, 0, 0), size=50)
         rect = lbl.get_rect(center=(WIDTH // 2, HEIGHT // 2))
         self.screen.blit(lbl, rect)
 
+    def show_thinking(self):
+        """
+        Mostra no título da janela a melhor linha da IA enquanto ela pensa
+        e, depois, o resumo do lance que ela jogou.
+        """
+        progress = self.game.ai.progress if self.game.ai.thinking else None
+        if progress:
+            depth, score, nodes, pv = progress
+            caption = f'Chess - IA pensando: profundidade {depth}, {score:+.2f}, {nodes} nós  ' + ' '.join(pv)
+        elif self.game.ai_report:
+            caption = f'Chess - IA: {self.game.ai_report}'
+        else:
+            caption = 'Chess'
+        if caption != self.caption:
+            pygame.display.set_caption(caption)
+            self.caption = caption
+
     def mainloop(self):
         screen = self.screen
         game = self.game
         dragger = game.dragger
 
         while True:
-            # 1. Desenha todos os elementos do jogo
-            self.game.show_bg(screen)
-            self.game.show_last_move(screen)
-            self.game.show_moves(screen)
-            self.game.show_pieces(screen)
-            self.game.show_hover(screen)
-            if dragger.dragging:
-                dragger.update_blit(screen)
+            # 1. Redesenha apenas o que mudou desde o último quadro
+            self.renderer.draw(screen)
 
             # 2. Lógica da IA (se for a vez dela e o jogo não tiver acabado)
-            if not game.game_over and game.next_player == 'black':
-                game.ai_move()
+            ai_turn = not game.game_over and game.next_player == 'black'
+            if ai_turn:
+                game.ai_update()
+            self.show_thinking()
 
             # 3. Processamento de eventos do usuário
-            for event in pygame.event.get():
+            events = pygame.event.get()
+            if not events and IDLE_WAIT and not ai_turn:
+                # Nada para animar: dorme até o próximo evento
+                events = [pygame.event.wait()]
+
+            for event in events:
                 if event.type == pygame.QUIT:
+                    game.ai.cancel(wait=True)
+                    game.search.close()
                     pygame.quit()
                     sys.exit()
 
@@ -85,7 +98,7 @@ class Main:
                         if game.board.squares[row][col].has_piece():
                             piece = game.board.squares[row][col].piece
                             if piece.color == game.next_player:
-                                game.board.calc_moves(piece, row, col)
+                                game.board.piece_moves(piece)
                                 dragger.save_initial(event.pos)
                                 dragger.drag_piece(piece)
                     
@@ -115,13 +128,11 @@ class Main:
                         game.change_theme()
                     elif event.key == pygame.K_r:
                         game.reset()
+                    elif event.key == pygame.K_s:
+                        game.save_pgn()
 
-            # 6. Exibe a tela de fim de jogo se a condição for verdadeira
-            if game.game_over:
-                self.show_game_over()
-            
-            # Atualiza a tela
-            pygame.display.update()
+            # 6. Limita a taxa de quadros
+            self.clock.tick(FPS)
 
 if __name__ == '__main__':
     Main().mainloop()
\ No newline at end of file
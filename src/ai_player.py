@@ -0,0 +1,70 @@
+import threading
+
+from position import move_name
+
+
+class AsyncAI:
+    """
+    Runs Search on a worker thread so the window keeps drawing and
+    handling events while the engine thinks. The search works on a
+    copy of the board; the main loop calls poll() every frame and gets
+    the chosen (piece, move) on the real board once it is ready.
+    """
+
+    def __init__(self, search):
+        self.search = search
+        self.thread = None
+        self.result = None
+        self.key = None
+        self.copy = None
+        self.cancelled = False
+        self.progress = None    # (depth, score, nodes, pv) after each finished iteration
+
+    @property
+    def thinking(self):
+        return self.thread is not None
+
+    def start(self, board):
+        if self.thread is not None:
+            return
+        self.result = None
+        self.progress = None
+        self.cancelled = False
+        self.key = board.key()
+        self.copy = board.copy()
+        self.search.info = self._report
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        best = self.search.run(self.copy)
+        self.result = best[1].encode() if best else None
+
+    def _report(self, search):
+        # worker thread, between iterations: the copy is at the root
+        pv = search.principal_variation(self.copy)
+        self.progress = (search.depth, search.score, search.nodes,
+                         [move_name(move.encode()) for piece, move in pv])
+
+    def poll(self, board):
+        # (piece, move) on board once the search is done, else None
+        if self.thread is None or self.thread.is_alive():
+            return None
+        self.thread = None
+        if self.cancelled or self.result is None or board.key() != self.key:
+            return None
+        return board.decode_move(self.result)
+
+    def cancel(self, wait=False):
+        # stops the search and drops its result; a new search can start
+        # once poll() has seen the thread finish
+        if self.thread is None:
+            return
+        self.cancelled = True
+        self.search.stop()
+        if wait:
+            # a stop that lands before run() starts is cleared by it
+            while self.thread.is_alive():
+                self.search.stop()
+                self.thread.join(0.01)
+            self.thread = None
@@ -0,0 +1,90 @@
+import os
+from collections import OrderedDict
+
+import pygame
+
+from sound import Sound
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLORS = ('white', 'black')
+PIECE_NAMES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+TEXTURE_SIZES = (80, 128)
+SOUNDS = ('move', 'capture')
+FONT_SIZES = (14, 50)     # coordinates and the game over message
+
+
+class AssetCache:
+    """
+    Loads every texture, font and sound once so the frame loop does no
+    file I/O. Textures come in the two shipped sizes; other sizes are
+    scaled from the 128px images and kept in a small LRU.
+    """
+
+    def __init__(self, max_scaled=64, max_labels=256):
+        self.textures = {}
+        self.scaled = OrderedDict()
+        self.max_scaled = max_scaled
+        self.fonts = {}
+        self.labels = OrderedDict()
+        self.max_labels = max_labels
+        self.sounds = {}
+
+    def texture_path(self, color, name, size):
+        return os.path.join(BASE_DIR, 'assets', 'images', f'imgs-{size}px', f'{color}_{name}.png')
+
+    def preload(self):
+        # convert_alpha needs the display mode to be set already
+        for size in TEXTURE_SIZES:
+            for color in COLORS:
+                for name in PIECE_NAMES:
+                    image = pygame.image.load(self.texture_path(color, name, size))
+                    self.textures[(color, name, size)] = image.convert_alpha()
+        for size in FONT_SIZES:
+            self.font('monospace', size, bold=True)
+        for name in SOUNDS:
+            try:
+                self.sounds[name] = Sound(os.path.join(BASE_DIR, 'assets', 'sounds', f'{name}.wav'))
+            except pygame.error:
+                # no audio device or missing file: carry on without sound
+                self.sounds[name] = None
+        return self
+
+    # ==================== LOOKUP ====================
+    def texture(self, color, name, size=80):
+        key = (color, name, size)
+        image = self.textures.get(key)
+        if image is not None:
+            return image
+
+        image = self.scaled.get(key)
+        if image is not None:
+            self.scaled.move_to_end(key)
+            return image
+        image = pygame.transform.smoothscale(self.textures[(color, name, TEXTURE_SIZES[-1])], (size, size))
+        self.scaled[key] = image
+        if len(self.scaled) > self.max_scaled:
+            self.scaled.popitem(last=False)
+        return image
+
+    def font(self, name='monospace', size=14, bold=False):
+        key = (name, size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.SysFont(name, size, bold=bold)
+        return font
+
+    def label(self, text, color, name='monospace', size=14, bold=True):
+        # rendered text surfaces are cached as well
+        key = (text, color, name, size, bold)
+        surface = self.labels.get(key)
+        if surface is not None:
+            self.labels.move_to_end(key)
+            return surface
+        surface = self.font(name, size, bold).render(text, True, color)
+        self.labels[key] = surface
+        if len(self.labels) > self.max_labels:
+            self.labels.popitem(last=False)
+        return surface
+
+    def sound(self, name):
+        return self.sounds.get(name)
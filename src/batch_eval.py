@@ -0,0 +1,252 @@
+"""
+Vectorized evaluation of many positions at once (needs NumPy).
+
+Positions are either (N, 64) arrays of square codes as returned by
+Board.square_codes() (piece type + 1, negative for black, a1=0) or
+(N, 12, 64) piece planes ordered like the bitboard core (white pawn ..
+black king). The score, in pawns from white's side, adds up:
+
+    material, tapered midgame/endgame piece-square tables,
+    mobility (attacked squares not holding an own piece, sliders
+    stopped by the first blocker) for knights, bishops, rooks, queens,
+    doubled, isolated and passed pawns.
+
+Material and piece-square terms are table lookups over the codes;
+mobility and pawn structure work on one uint64 bitboard per piece code
+and position, with shifts and Kogge-Stone fills. evaluate_reference()
+computes the same terms for one position in plain Python; bench.py
+batch checks that both agree.
+"""
+try:
+    import numpy as np
+except ImportError:     # optional dependency, only this module needs it
+    np = None
+
+from bitboard import KNIGHT, BISHOP, ROOK, QUEEN, KNIGHT_ATTACKS, BIT, FILE_A, \
+    bishop_attacks, rook_attacks, queen_attacks, popcount
+from evaluation import PST_MG, PST_EG, PHASE_WEIGHTS, MAX_PHASE, MOBILITY_WEIGHTS, \
+    DOUBLED_PAWN, ISOLATED_PAWN, PASSED_PAWN, tapered
+from piece import Pawn, Knight, Bishop, Rook, Queen
+
+# kings are left out: they are always one each and cancel
+VALUES = tuple(cls('white').value for cls in (Pawn, Knight, Bishop, Rook, Queen)) + (0.0,)
+
+CHUNK = 16384   # positions per pass, bounds the temporary arrays
+
+FILE_H = FILE_A << 7
+NOT_A = 0xFFFFFFFFFFFFFFFF ^ FILE_A
+NOT_H = 0xFFFFFFFFFFFFFFFF ^ FILE_H
+# (square delta, mask of squares that can be reached without wrapping)
+NORTH, SOUTH, EAST, WEST = (8, ~0), (-8, ~0), (1, NOT_A), (-1, NOT_H)
+NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST = (9, NOT_A), (7, NOT_H), (-7, NOT_A), (-9, NOT_H)
+STRAIGHT = (NORTH, SOUTH, EAST, WEST)
+DIAGONAL = (NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST)
+SLIDER_DIRECTIONS = ((BISHOP, DIAGONAL), (ROOK, STRAIGHT), (QUEEN, STRAIGHT + DIAGONAL))
+NOT_AB = NOT_A & (NOT_A << 1)
+NOT_GH = NOT_H & (NOT_H >> 1)
+KNIGHT_JUMPS = ((17, NOT_A), (15, NOT_H), (10, NOT_AB), (6, NOT_GH),
+                (-6, NOT_AB), (-10, NOT_GH), (-15, NOT_A), (-17, NOT_H))
+
+
+def _passed_mask(sq, color):
+    # squares in front of a pawn on its own and the adjacent files
+    rank, file = sq >> 3, sq & 7
+    ranks = range(rank + 1, 8) if color == 0 else range(rank)
+    return sum(BIT[t] for t in range(64) if (t >> 3) in ranks and abs((t & 7) - file) <= 1)
+
+PASSED_MASKS = [[_passed_mask(sq, color) for sq in range(64)] for color in (0, 1)]
+
+def _tables():
+    t = {}
+    # lookups by [code + 6, square], codes running from -6 (black king) to 6
+    def lookup(value):
+        return np.array([[value(code, sq) for sq in range(64)] for code in range(-6, 7)])
+    def signed(table):
+        return lambda code, sq: 0.0 if code == 0 else \
+            table[code - 1][sq] if code > 0 else -table[-code - 1][sq ^ 56]
+    t['mg'] = lookup(signed(PST_MG))
+    t['eg'] = lookup(signed(PST_EG))
+    t['values'] = lookup(lambda code, sq: 0.0 if code == 0 else VALUES[abs(code) - 1] * (1 if code > 0 else -1))
+    t['phase'] = lookup(lambda code, sq: 0 if code == 0 else PHASE_WEIGHTS[abs(code) - 1])
+    return t
+
+TABLES = _tables() if np is not None else None
+SQUARES = np.arange(64) if np is not None else None
+
+
+# ==================== BITBOARD ARRAYS ====================
+def _u64(value):
+    return np.uint64(value & 0xFFFFFFFFFFFFFFFF)
+
+def _shift(bb, delta):
+    return bb << _u64(delta) if delta > 0 else bb >> _u64(-delta)
+
+def _step(bb, direction):
+    delta, mask = direction
+    return _shift(bb, delta) & _u64(mask)
+
+def _ray_attacks(sliders, empty, direction):
+    # Kogge-Stone occluded fill, then one more step onto the blocker
+    delta, mask = direction
+    mask = _u64(mask)
+    pro = empty & mask
+    gen = sliders
+    gen = gen | (pro & _shift(gen, delta))
+    pro = pro & _shift(pro, delta)
+    gen = gen | (pro & _shift(gen, 2 * delta))
+    pro = pro & _shift(pro, 2 * delta)
+    gen = gen | (pro & _shift(gen, 4 * delta))
+    return _shift(gen, delta) & mask
+
+def _fill(bb, delta):
+    # bb and every square beyond it in direction delta (a whole file for +-8)
+    for n in (1, 2, 4):
+        bb = bb | _shift(bb, n * delta)
+    return bb
+
+if np is not None and hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8) if np is not None else None
+    def _popcount(bb):
+        return _BYTE_COUNTS[bb.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+def _bitboards(codes):
+    # one uint64 per position and piece code (index code + 6)
+    boards = {}
+    for code in range(-6, 7):
+        if code:
+            bits = np.packbits(codes == code, axis=1, bitorder='little')
+            boards[code] = np.ascontiguousarray(bits).view('<u8').ravel().astype(np.uint64)
+    return boards
+
+
+# ==================== BATCH ====================
+def as_codes(positions):
+    # (N, 64) int8 square codes from codes or planes
+    if np is None:
+        raise ImportError('batch evaluation needs numpy')
+    arr = np.asarray(positions)
+    if arr.ndim == 2 and arr.shape[1] == 64:
+        return arr.astype(np.int8, copy=False)
+    if arr.ndim == 3 and arr.shape[1:] == (12, 64):
+        codes = np.zeros((arr.shape[0], 64), dtype=np.int8)
+        for ptype in range(6):
+            codes[arr[:, ptype] != 0] = ptype + 1
+            codes[arr[:, 6 + ptype] != 0] = -(ptype + 1)
+        return codes
+    raise ValueError(f'expected (N, 64) codes or (N, 12, 64) planes, got shape {arr.shape}')
+
+def evaluate_batch(positions):
+    # N-vector of scores in pawns, positive when white is better
+    codes = as_codes(positions)
+    scores = np.empty(len(codes))
+    for start in range(0, len(codes), CHUNK):
+        scores[start:start + CHUNK] = _evaluate_chunk(codes[start:start + CHUNK])
+    return scores
+
+def static_batch(positions):
+    # N-vector of the material and piece-square part alone, the terms
+    # Board keeps incrementally (evaluation.incremental_score)
+    codes = as_codes(positions)
+    scores = np.empty(len(codes))
+    for start in range(0, len(codes), CHUNK):
+        scores[start:start + CHUNK] = _static_chunk(codes[start:start + CHUNK])
+    return scores
+
+def _static_chunk(codes):
+    t = TABLES
+    index = codes.astype(np.intp) + 6
+    material = t['values'][index, SQUARES].sum(axis=1)
+    mg = t['mg'][index, SQUARES].sum(axis=1)
+    eg = t['eg'][index, SQUARES].sum(axis=1)
+    phase = np.minimum(t['phase'][index, SQUARES].sum(axis=1), MAX_PHASE)
+    return material + (mg * phase + eg * (MAX_PHASE - phase)) / MAX_PHASE
+
+def _evaluate_chunk(codes):
+    score = _static_chunk(codes)
+    boards = _bitboards(codes)
+    white = [boards[ptype + 1] for ptype in range(6)]
+    black = [boards[-(ptype + 1)] for ptype in range(6)]
+    white_occ = white[0] | white[1] | white[2] | white[3] | white[4] | white[5]
+    black_occ = black[0] | black[1] | black[2] | black[3] | black[4] | black[5]
+    empty = ~(white_occ | black_occ)
+    score += _mobility(white, ~white_occ, empty) - _mobility(black, ~black_occ, empty)
+    score += _pawn_structure(white[0], black[0], 0) - _pawn_structure(black[0], white[0], 1)
+    return score
+
+def _mobility(side, free, empty):
+    # per direction the rays (or jumps) of different pieces never meet,
+    # so summing popcounts over directions counts every piece separately
+    total = 0.0
+    knights = side[KNIGHT]
+    count = sum(_popcount(_step(knights, jump) & free).astype(np.int64) for jump in KNIGHT_JUMPS)
+    total = total + MOBILITY_WEIGHTS[KNIGHT] * count
+    for ptype, directions in SLIDER_DIRECTIONS:
+        sliders = side[ptype]
+        count = sum(_popcount(_ray_attacks(sliders, empty, d) & free).astype(np.int64) for d in directions)
+        total = total + MOBILITY_WEIGHTS[ptype] * count
+    return total
+
+def _pawn_structure(pawns, enemy, color):
+    files = np.stack([_popcount(pawns & _u64(FILE_A << f)) for f in range(8)], axis=1).astype(np.int64)
+    doubled = np.maximum(files - 1, 0).sum(axis=1)
+    neighbours = np.zeros_like(files)
+    neighbours[:, 1:] += files[:, :-1]
+    neighbours[:, :-1] += files[:, 1:]
+    isolated = (files * (neighbours == 0)).sum(axis=1)
+
+    # squares behind the enemy pawns, on their files and the adjacent ones
+    back = -8 if color == 0 else 8
+    behind = _fill(_shift(enemy, back), back)
+    blocked = behind | _step(behind, EAST) | _step(behind, WEST)
+    passed = pawns & ~blocked
+    bonus = 0.0
+    for rank in range(1, 7):
+        relative = rank if color == 0 else 7 - rank
+        bonus = bonus + PASSED_PAWN[relative] * _popcount(passed & _u64(0xFF << (8 * rank)))
+    return DOUBLED_PAWN * doubled + ISOLATED_PAWN * isolated + bonus
+
+
+# ==================== SCALAR REFERENCE ====================
+def evaluate_reference(codes):
+    # the same score for one list of 64 square codes, without NumPy
+    bb = [[0] * 6, [0] * 6]
+    material = mg = eg = 0.0
+    phase = 0
+    for sq, code in enumerate(codes):
+        if code == 0:
+            continue
+        color, ptype = (0, code - 1) if code > 0 else (1, -code - 1)
+        sign = 1 if color == 0 else -1
+        bb[color][ptype] |= BIT[sq]
+        table_sq = sq if color == 0 else sq ^ 56
+        material += sign * VALUES[ptype]
+        mg += sign * PST_MG[ptype][table_sq]
+        eg += sign * PST_EG[ptype][table_sq]
+        phase += PHASE_WEIGHTS[ptype]
+    score = material + tapered(mg, eg, phase)
+
+    own = [sum(pieces) for pieces in bb]
+    occ = own[0] | own[1]
+    attacks = {KNIGHT: lambda sq: KNIGHT_ATTACKS[sq], BISHOP: lambda sq: bishop_attacks(sq, occ),
+               ROOK: lambda sq: rook_attacks(sq, occ), QUEEN: lambda sq: queen_attacks(sq, occ)}
+    for color in (0, 1):
+        sign = 1 if color == 0 else -1
+        for ptype, attack in attacks.items():
+            pieces = bb[color][ptype]
+            for sq in range(64):
+                if pieces & BIT[sq]:
+                    score += sign * MOBILITY_WEIGHTS[ptype] * popcount(attack(sq) & ~own[color])
+
+        pawns, enemy = bb[color][0], bb[1 - color][0]
+        files = [popcount(pawns & (0x0101010101010101 << f)) for f in range(8)]
+        for f, n in enumerate(files):
+            score += sign * DOUBLED_PAWN * max(n - 1, 0)
+            if n and (f == 0 or not files[f - 1]) and (f == 7 or not files[f + 1]):
+                score += sign * ISOLATED_PAWN * n
+        for sq in range(64):
+            if pawns & BIT[sq]:
+                if not PASSED_MASKS[color][sq] & enemy:
+                    score += sign * PASSED_PAWN[sq >> 3 if color == 0 else 7 - (sq >> 3)]
+    return score
@@ -0,0 +1,247 @@
+"""
+Micro benchmarks for the Board front end.
+
+    python src/bench.py memory              # allocations per generated move
+    python src/bench.py memory -p kiwipete -n 50
+    python src/bench.py batch -n 20000        # NumPy batch evaluation
+    python src/bench.py pgn -n 20000          # PGN reader and replay throughput
+    python src/bench.py pgn -f games.pgn      # ... on a real file
+    python src/bench.py smp -w 1 2 4 -d 5     # Lazy SMP speedup per worker count
+
+Positions are the perft suite (see perft.py).
+"""
+import argparse
+import io
+import random
+import sys
+import time
+import tracemalloc
+
+from board import Board
+from perft import POSITIONS
+from evaluation import material, incremental_score
+from gamestate import GameState
+import pgn
+
+
+# ==================== MEMORY ====================
+def memory(names, repeat):
+    # allocations and bytes that stay alive per generated legal move
+    boards = [Board.from_fen(POSITIONS[name][0]) for name in names]
+    for board in boards:
+        board.legal_moves(board.next_player)
+
+    tracemalloc.start()
+    kept, moves = [], 0
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            board.legal_cache = None
+            generated = board.legal_moves(board.next_player)
+            moves += len(generated)
+            kept.append(generated)
+    seconds = time.perf_counter() - start
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    blocks = sum(s.count_diff for s in stats)
+    size = sum(s.size_diff for s in stats)
+    return {
+        'moves': moves,
+        'blocks_per_move': blocks / moves,
+        'bytes_per_move': size / moves,
+        'peak_kb': peak / 1024,
+        'moves_per_second': moves / seconds,
+    }
+
+
+# ==================== BATCH EVALUATION ====================
+def sample_positions(count, seed=1, max_plies=120):
+    # boards from random games, one per ply
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = Board()
+        for _ in range(max_plies):
+            moves = board.legal_moves(board.next_player)
+            if not moves or len(boards) >= count:
+                break
+            board.move(*rng.choice(moves), testing=True)
+            boards.append(Board.from_fen(board.to_fen()))
+    return boards
+
+def batch(count, check):
+    import batch_eval
+    if batch_eval.np is None:
+        raise SystemExit('batch evaluation needs numpy')
+    np = batch_eval.np
+
+    boards = sample_positions(min(count, 2000))
+    codes = np.array([b.square_codes() for b in boards], dtype=np.int8)
+    codes = np.resize(codes, (count, 64))       # repeat the sample up to count
+    results = {}
+
+    start = time.perf_counter()
+    for board in boards:
+        material(board)
+    results['scalar material'] = len(boards) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    reference = [batch_eval.evaluate_reference(c) for c in codes[:len(boards)].tolist()]
+    results['scalar full'] = len(boards) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    scores = batch_eval.evaluate_batch(codes)
+    results['numpy batch'] = count / (time.perf_counter() - start)
+
+    errors = []
+    if check:
+        diff = np.abs(scores[:len(boards)] - np.array(reference))
+        if diff.max() > 1e-9:
+            errors.append(f'batch differs from the reference by up to {diff.max():.3g}')
+        index = codes[:len(boards)].astype(np.intp) + 6
+        batch_material = batch_eval.TABLES['values'][index, batch_eval.SQUARES].sum(axis=1)
+        scalar_material = np.array([material(b) for b in boards])
+        if np.abs(batch_material - scalar_material).max() > 1e-6:
+            errors.append('batch material differs from evaluation.material')
+        # material + piece-square tables against the engine's own running sums
+        batch_static = batch_eval.static_batch(codes[:len(boards)])
+        engine_static = np.array([incremental_score(b.eval_material, b.eval_mg, b.eval_eg, b.eval_phase)
+                                  for b in boards])
+        diff = np.abs(batch_static - engine_static)
+        if diff.max() > 1e-6:
+            errors.append(f'batch material + PST differs from evaluation.incremental_score '
+                          f'by up to {diff.max():.3g}')
+    return results, errors
+
+
+# ==================== PGN ====================
+def sample_pgn(count, seed=1, max_plies=160):
+    # PGN text of random games played through GameState
+    rng = random.Random(seed)
+    games = []
+    for index in range(count):
+        game = GameState()
+        while not game.game_over and len(game.sans) < max_plies:
+            game.play_move(*rng.choice(game.board.legal_moves(game.next_player)))
+        games.append(game.pgn({'Event': 'Random game', 'Round': str(index + 1)}))
+    return '\n'.join(games)
+
+def pgn_throughput(open_games, replay_limit):
+    # games/s for reading only, then for reading and replaying every move
+    results = {}
+    start = time.perf_counter()
+    games = plies = 0
+    for tags, sans, result in pgn.read_games(open_games()):
+        games += 1
+        plies += len(sans)
+    seconds = time.perf_counter() - start
+    results['read'] = (games, plies, seconds)
+
+    start = time.perf_counter()
+    games = plies = errors = 0
+    for tags, sans, result in pgn.read_games(open_games()):
+        if games >= replay_limit:
+            break
+        games += 1
+        try:
+            for _ in pgn.replay(sans, pgn.start_board(tags)):
+                plies += 1
+        except ValueError:
+            errors += 1
+    results['read + replay'] = (games, plies, time.perf_counter() - start)
+    return results, errors
+
+# ==================== LAZY SMP ====================
+def smp(names, depth, worker_counts, hash_mb):
+    # fixed-depth time and nodes per worker count, summed over positions;
+    # every run starts from an empty table and running helpers
+    from parallel import ParallelSearch
+    boards = [Board.from_fen(POSITIONS[name][0]) for name in names]
+    results = {}
+    for workers in worker_counts:
+        seconds = nodes = 0
+        for board in boards:
+            search = ParallelSearch(workers, max_depth=depth, hash_mb=hash_mb)
+            try:
+                search.run(board)     # helpers import and warm up
+                search.shared.clear()
+                search.run(board)
+                seconds += search.elapsed
+                nodes += search.nodes
+            finally:
+                search.close()
+        results[workers] = (seconds, nodes)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Board micro benchmarks.')
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    mem = sub.add_parser('memory', help='tracemalloc: allocations per generated move')
+    mem.add_argument('-p', '--position', action='append', choices=sorted(POSITIONS),
+                     help='named position (repeatable, default: whole suite)')
+    mem.add_argument('-n', '--repeat', type=int, default=20)
+
+    bat = sub.add_parser('batch', help='NumPy batch evaluator against the scalar evaluators')
+    bat.add_argument('-n', '--count', type=int, default=20000, help='positions in the batch')
+    bat.add_argument('--no-check', dest='check', action='store_false',
+                     help='skip the consistency check against the scalar reference')
+
+    pg = sub.add_parser('pgn', help='streaming PGN reader and Board replay')
+    pg.add_argument('-f', '--file', help='PGN file to read (default: random games)')
+    pg.add_argument('-n', '--count', type=int, default=20000, help='generated games (repeats a sample of 200)')
+    pg.add_argument('--replay', type=int, default=2000, help='games to replay onto a Board')
+
+    sm = sub.add_parser('smp', help='Lazy SMP: time to depth and nodes/s per worker count')
+    sm.add_argument('-p', '--position', action='append', choices=sorted(POSITIONS),
+                    help='named position (repeatable, default: startpos, kiwipete, position3, position4)')
+    sm.add_argument('-d', '--depth', type=int, default=4)
+    sm.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 2, 4])
+    sm.add_argument('--hash', type=int, default=16, help='shared table size in MB')
+
+    args = parser.parse_args(argv)
+    if args.bench == 'memory':
+        r = memory(args.position or list(POSITIONS), args.repeat)
+        print(f"{r['moves']} moves kept alive: {r['blocks_per_move']:.1f} blocks, "
+              f"{r['bytes_per_move']:.0f} bytes per move, peak {r['peak_kb']:.0f} KiB, "
+              f"{r['moves_per_second']:.0f} moves/s (traced)")
+    elif args.bench == 'batch':
+        results, errors = batch(args.count, args.check)
+        for name, rate in results.items():
+            print(f'{name:16} {rate:12.0f} positions/s')
+        for error in errors:
+            print('inconsistent:', error)
+        if args.check and not errors:
+            print('batch scores match the scalar reference')
+        return 1 if errors else 0
+    elif args.bench == 'pgn':
+        if args.file:
+            open_games = lambda: open(args.file, encoding='utf-8', errors='replace')
+        else:
+            sample = sample_pgn(min(args.count, 200))
+            text = '\n'.join([sample] * (args.count // 200 or 1))
+            open_games = lambda: io.StringIO(text)
+        results, errors = pgn_throughput(open_games, args.replay)
+        for name, (games, plies, seconds) in results.items():
+            print(f'{name:14} {games:8} games {plies:9} plies  {games / seconds:8.0f} games/s '
+                  f'{60 * games / seconds:10.0f} games/min {plies / seconds:9.0f} plies/s')
+        if errors:
+            print(f'{errors} games with an illegal or unreadable move')
+        return 1 if errors else 0
+    elif args.bench == 'smp':
+        names = args.position or ['startpos', 'kiwipete', 'position3', 'position4']
+        results = smp(names, args.depth, args.workers, args.hash)
+        base = results[args.workers[0]][0]
+        for workers, (seconds, nodes) in results.items():
+            print(f'{workers:2} workers  {seconds:7.2f} s  speedup {base / seconds:5.2f}  '
+                  f'{nodes:9} nodes  {nodes / seconds:8.0f} nodes/s  '
+                  f'{nodes / seconds / workers:8.0f} nodes/s per worker')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
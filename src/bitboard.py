@@ -0,0 +1,126 @@
+#Bitboard helpers and precomputed attack tables
+#Squares are numbered a1=0, b1=1, ..., h8=63 (rank * 8 + file)
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 0, 1, 2, 3, 4, 5
+
+COLORS = ('white', 'black')
+PIECE_NAMES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+PIECE_TYPES = {name: i for i, name in enumerate(PIECE_NAMES)}
+
+FULL = 0xFFFFFFFFFFFFFFFF
+BIT = [1 << sq for sq in range(64)]
+
+FILE_A = 0x0101010101010101
+RANK_1 = 0xFF
+RANK_2 = RANK_1 << 8
+RANK_4 = RANK_1 << 24
+RANK_5 = RANK_1 << 32
+RANK_7 = RANK_1 << 48
+RANK_8 = RANK_1 << 56
+
+
+def square_index(row, col):
+    # Board rows run from rank 8 (row 0) down to rank 1 (row 7)
+    return (7 - row) * 8 + col
+
+def square_row_col(sq):
+    return 7 - (sq >> 3), sq & 7
+
+def square_name(sq):
+    return 'abcdefgh'[sq & 7] + str((sq >> 3) + 1)
+
+def piece_index(color, ptype):
+    return color * 6 + ptype
+
+def lsb(bb):
+    return (bb & -bb).bit_length() - 1
+
+def popcount(bb):
+    return bin(bb).count('1')
+
+def squares_of(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+def flip_vertical(bb):
+    return int.from_bytes(bb.to_bytes(8, 'little'), 'big')
+
+
+# ==================== LEAPER TABLES ====================
+def _leaper_table(deltas):
+    table = []
+    for sq in range(64):
+        rank, file = sq >> 3, sq & 7
+        bb = 0
+        for dr, df in deltas:
+            r, f = rank + dr, file + df
+            if 0 <= r < 8 and 0 <= f < 8:
+                bb |= 1 << (r * 8 + f)
+        table.append(bb)
+    return table
+
+KNIGHT_ATTACKS = _leaper_table([(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)])
+KING_ATTACKS = _leaper_table([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)])
+# squares attacked by a pawn of the given color standing on sq
+PAWN_ATTACKS = [_leaper_table([(1, -1), (1, 1)]), _leaper_table([(-1, -1), (-1, 1)])]
+
+
+# ==================== SLIDER TABLES ====================
+def _line_mask(sq, dr, df):
+    rank, file = sq >> 3, sq & 7
+    bb = 0
+    for sign in (1, -1):
+        r, f = rank + dr * sign, file + df * sign
+        while 0 <= r < 8 and 0 <= f < 8:
+            bb |= 1 << (r * 8 + f)
+            r, f = r + dr * sign, f + df * sign
+    return bb
+
+FILE_MASKS = [_line_mask(sq, 1, 0) for sq in range(64)]
+DIAG_MASKS = [_line_mask(sq, 1, 1) for sq in range(64)]
+ANTI_DIAG_MASKS = [_line_mask(sq, 1, -1) for sq in range(64)]
+BIT_FLIPPED = [flip_vertical(b) for b in BIT]
+
+def _first_rank_attacks():
+    # FIRST_RANK[file][occupancy of the rank] -> attacks along rank 1
+    table = []
+    for file in range(8):
+        row = []
+        for occ in range(256):
+            bb = 0
+            for step in (1, -1):
+                f = file + step
+                while 0 <= f < 8:
+                    bb |= 1 << f
+                    if occ & (1 << f):
+                        break
+                    f += step
+            row.append(bb)
+        table.append(row)
+    return table
+
+FIRST_RANK = _first_rank_attacks()
+
+
+def _line_attacks(occ, sq, mask):
+    # hyperbola quintessence: (o - 2s) ^ reverse(reverse(o) - 2 reverse(s))
+    o = occ & mask
+    forward = (o - (BIT[sq] << 1)) & FULL
+    reverse = (flip_vertical(o) - (BIT_FLIPPED[sq] << 1)) & FULL
+    return (forward ^ flip_vertical(reverse)) & mask
+
+def rank_attacks(sq, occ):
+    shift = sq & 56
+    return FIRST_RANK[sq & 7][(occ >> shift) & 0xFF] << shift
+
+def bishop_attacks(sq, occ):
+    return _line_attacks(occ, sq, DIAG_MASKS[sq]) | _line_attacks(occ, sq, ANTI_DIAG_MASKS[sq])
+
+def rook_attacks(sq, occ):
+    return _line_attacks(occ, sq, FILE_MASKS[sq]) | rank_attacks(sq, occ)
+
+def queen_attacks(sq, occ):
+    return bishop_attacks(sq, occ) | rook_attacks(sq, occ)
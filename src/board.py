@@ -1,254 +1,438 @@
-import copy
-import os
 from const import *
 from square import Square
 from piece import *
 from move import Move
-from sound import Sound
+from undo import Undo
+from bitboard import *
+from position import *
+from zobrist import *
+from evaluation import PIECE_VALUES, PIECE_SQUARE_MG, PIECE_SQUARE_EG, PIECE_PHASE
+from movetables import KNIGHT_TARGETS, KING_TARGETS, PAWN_PUSHES, PAWN_CAPTURES, \
+    STRAIGHT_RAYS, DIAGONAL_RAYS, QUEEN_RAYS
+
+PIECE_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)
+# flag & 3 of the promotions generated after the queen: knight, rook, bishop
+UNDERPROMOTIONS = (0, 2, 1)
 
 class Board:
 
     def __init__(self):
-        self.squares = [[0 for _ in range(COLS)] for _ in range(ROWS)]
-        self.last_move = None
-        self._create()
+        self._clear()
         self._add_pieces('white')
         self._add_pieces('black')
+        self._index_kings()
+        self.zobrist_key = self.compute_key()
+        self.eval_material, self.eval_mg, self.eval_eg, self.eval_phase = self.compute_eval()
+        self.key_counts = {self.zobrist_key: 1}
+        self.piece_count = 32
+
+    # set to True to check the incremental key and evaluation against a full recompute
+    debug = False
 
     # ==================== MOVE EXECUTION ====================
     def move(self, piece, move, testing=False):
+        undo = self.make_move(piece, move)
+        piece.clear_moves()
+        self.legal_cache = self.legal_set = None
+
+        # sound and rendering live outside the core, as observers
+        if not testing:
+            for observer in self.observers:
+                observer.on_move(self, piece, move, undo.captured)
+
+    def add_observer(self, observer):
+        # observer.on_move(board, piece, move, captured) runs after every real move
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        self.observers.remove(observer)
+
+    def make_move(self, piece, move):
         initial, final = move.initial, move.final
-        en_passant_empty = self.squares[final.row][final.col].isempty()
+        undo = Undo(piece, move, self.last_move, self.en_passant_square, self.zobrist_key)
+        undo.halfmove, undo.fullmove = self.halfmove, self.fullmove
+        undo.eval = (self.eval_material, self.eval_mg, self.eval_eg, self.eval_phase)
+        key = self.zobrist_key ^ SIDE_KEY
+
+        # en passant is only available for one move
+        if self.en_passant_square is not None:
+            self.en_passant_square.piece.en_passant = False
+            key ^= EN_PASSANT_KEYS[self.en_passant_square.col]
+            self.en_passant_square = None
+
+        # captured piece (en passant captures beside the final square)
+        captured_square = self.squares[final.row][final.col]
+        if isinstance(piece, Pawn) and final.col != initial.col and captured_square.isempty():
+            captured_square = self.squares[initial.row][final.col]
+
+        castling_changed = isinstance(piece, (King, Rook)) or isinstance(captured_square.piece, Rook)
+        if castling_changed:
+            key ^= CASTLING_KEYS[self.castling_rights()]
+
+        if captured_square.has_piece():
+            undo.captured = captured_square.piece
+            undo.captured_square = captured_square
+            captured_square.piece = None
+            key ^= self._piece_key(undo.captured, captured_square)
+            self._eval_remove(undo.captured, captured_square)
+            self.piece_count -= 1
 
         self.squares[initial.row][initial.col].piece = None
         self.squares[final.row][final.col].piece = piece
+        piece.moved = True
+        key ^= self._piece_key(piece, initial) ^ self._piece_key(piece, final)
+        self._eval_move(piece, initial, final)
+        if isinstance(piece, King):
+            self.kings[piece.color] = self.squares[final.row][final.col]
 
-        # pawn specific moves
-        if isinstance(piece, Pawn):
-            diff = final.col - initial.col
-            if diff != 0 and en_passant_empty:
-                self.squares[initial.row][final.col].piece = None
-            
-            self.check_promotion(piece, final)
+        # pawn promotion (check_promotion updates the key and evaluation itself)
+        self.zobrist_key = key
+        if isinstance(piece, Pawn) and (final.row == 0 or final.row == 7):
+            self.check_promotion(piece, final, move.flag)
+        key = self.zobrist_key
 
         # king castling
         if isinstance(piece, King) and self.castling(initial, final):
-            diff = final.col - initial.col
-            rook = piece.left_rook if (diff < 0) else piece.right_rook
-            self.move(rook, rook.moves[-1], testing=testing)
+            rook_col, rook_final_col = (0, 3) if final.col < initial.col else (7, 5)
+            rook_initial = self.squares[initial.row][rook_col]
+            rook_final = self.squares[initial.row][rook_final_col]
+            rook = rook_initial.piece
+            undo.rook = rook
+            undo.rook_initial = rook_initial
+            undo.rook_final = rook_final
+            undo.rook_moved = rook.moved
+            rook_initial.piece = None
+            rook_final.piece = rook
+            rook.moved = True
+            key ^= self._piece_key(rook, rook_initial) ^ self._piece_key(rook, rook_final)
+            self._eval_move(rook, rook_initial, rook_final)
+
+        if castling_changed:
+            key ^= CASTLING_KEYS[self.castling_rights()]
 
-        piece.moved = True
-        piece.clear_moves()
-        self.last_move = move
-        
-        if not testing:
-            if en_passant_empty:
-                Sound(os.path.join('assets/sounds/move.wav')).play()
-            else:
-                Sound(os.path.join('assets/sounds/capture.wav')).play()
-        
-        # Seta o en passant para o peão
         if isinstance(piece, Pawn) and abs(final.row - initial.row) == 2:
-            self.set_true_en_passant(piece)
+            piece.en_passant = True
+            self.en_passant_square = self.squares[final.row][final.col]
+            key ^= EN_PASSANT_KEYS[final.col]
+
+        if isinstance(piece, Pawn) or undo.captured is not None:
+            self.halfmove = 0
+        else:
+            self.halfmove += 1
+        if piece.color == 'black':
+            self.fullmove += 1
+
+        # repetition index: positions since the last irreversible move
+        if self.halfmove == 0:
+            undo.key_counts = self.key_counts
+            self.key_counts = {key: 1}
+        else:
+            self.key_counts[key] = self.key_counts.get(key, 0) + 1
+
+        self.last_move = move
+        self.next_player = 'black' if piece.color == 'white' else 'white'
+        self.zobrist_key = key
+        if self.debug:
+            assert key == self.compute_key(), 'incremental zobrist key out of sync'
+            assert (self.eval_material, self.eval_mg, self.eval_eg, self.eval_phase) == self.compute_eval(), \
+                'incremental evaluation out of sync'
+        return undo
+
+    def unmake_move(self, undo):
+        piece, move = undo.piece, undo.move
+        initial, final = move.initial, move.final
+
+        if self.en_passant_square is not None:
+            self.en_passant_square.piece.en_passant = False
+
+        if undo.rook is not None:
+            undo.rook_final.piece = None
+            undo.rook_initial.piece = undo.rook
+            undo.rook.moved = undo.rook_moved
+
+        self.squares[final.row][final.col].piece = None
+        self.squares[initial.row][initial.col].piece = piece
+        piece.moved = undo.moved
+        if isinstance(piece, King):
+            self.kings[piece.color] = self.squares[initial.row][initial.col]
+
+        if undo.captured is not None:
+            undo.captured_square.piece = undo.captured
+            self.piece_count += 1
+
+        self.en_passant_square = undo.en_passant_square
+        if self.en_passant_square is not None:
+            self.en_passant_square.piece.en_passant = True
+
+        self.last_move = undo.last_move
+        self.next_player = piece.color
+        self.halfmove, self.fullmove = undo.halfmove, undo.fullmove
+        if undo.key_counts is not None:
+            self.key_counts = undo.key_counts
         else:
-            for row in range(ROWS):
-                for col in range(COLS):
-                    sq = self.squares[row][col]
-                    if isinstance(sq.piece, Pawn):
-                        sq.piece.en_passant = False
+            count = self.key_counts[self.zobrist_key] - 1
+            if count:
+                self.key_counts[self.zobrist_key] = count
+            else:
+                del self.key_counts[self.zobrist_key]
+        self.zobrist_key = undo.key
+        self.eval_material, self.eval_mg, self.eval_eg, self.eval_phase = undo.eval
 
     def valid_move(self, piece, move):
-        return move in piece.moves
+        # set lookup on the move's from/to code, not a scan of piece.moves
+        return self.squares[move.initial.row][move.initial.col].piece is piece and \
+            move in self._legal_set(piece.color)
 
-    def check_promotion(self, piece, final):
+    def check_promotion(self, piece, final, flag=PROMOTION | 3):
+        # promotes to the piece in the move flag, a queen for moves without one
         if final.row == 0 or final.row == 7:
-            self.squares[final.row][final.col].piece = Queen(piece.color)
+            kind = PIECE_CLASSES[KNIGHT + (flag & 3)] if flag & PROMOTION else Queen
+            promoted = kind(piece.color)
+            self.squares[final.row][final.col].piece = promoted
+            self.zobrist_key ^= self._piece_key(piece, final) ^ self._piece_key(promoted, final)
+            self._eval_remove(piece, final)
+            self._eval_add(promoted, final)
 
     def castling(self, initial, final):
         return abs(initial.col - final.col) == 2
 
-    def set_true_en_passant(self, piece):
-        if not isinstance(piece, Pawn):
-            return
-        
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = self.squares[row][col]
-                if square.has_piece() and isinstance(square.piece, Pawn):
-                    square.piece.en_passant = False
-        
-        piece.en_passant = True
-
     # ==================== CHECK ====================
+    def is_square_attacked(self, square, by_color):
+        index = square.row * COLS + square.col
+        squares = self.squares
+
+        # a pawn of by_color attacks the target from where the other color's pawn would capture
+        for r, c in PAWN_CAPTURES['black' if by_color == 'white' else 'white'][index]:
+            p = squares[r][c].piece
+            if isinstance(p, Pawn) and p.color == by_color:
+                return True
+
+        for targets, kind in ((KNIGHT_TARGETS[index], Knight), (KING_TARGETS[index], King)):
+            for r, c in targets:
+                p = squares[r][c].piece
+                if isinstance(p, kind) and p.color == by_color:
+                    return True
+
+        for rays, kinds in ((STRAIGHT_RAYS[index], (Rook, Queen)), (DIAGONAL_RAYS[index], (Bishop, Queen))):
+            for ray in rays:
+                for r, c in ray:
+                    p = squares[r][c].piece
+                    if p is not None:
+                        if isinstance(p, kinds) and p.color == by_color:
+                            return True
+                        break
+        return False
+
     def is_in_check(self, color, board=None):
         temp_board = board if board else self
-        
-        king = None
-        for row in range(ROWS):
-            for col in range(COLS):
-                if isinstance(temp_board.squares[row][col].piece, King) and \
-                   temp_board.squares[row][col].piece.color == color:
-                    king = temp_board.squares[row][col].piece
-                    king_row, king_col = row, col
-                    break
-            if king:
-                break
-        
-        if not king:
+
+        king_square = temp_board.kings.get(color)
+        if king_square is None:
             return False
 
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = temp_board.squares[row][col]
-                if square.has_enemy_piece(color):
-                    p = square.piece
-                    temp_board.calc_moves(p, row, col, bool=False)
-                    for m in p.moves:
-                        if isinstance(m.final.piece, King):
-                            return True
-        return False
-    
+        enemy = 'black' if color == 'white' else 'white'
+        return temp_board.is_square_attacked(king_square, enemy)
+
     def in_check(self, piece, move):
-        temp_piece = copy.deepcopy(piece)
-        temp_board = copy.deepcopy(self)
-        temp_board.move(temp_piece, move, testing=True)
-        
-        return temp_board.is_in_check(temp_piece.color)
+        # trial move: does the move leave piece's king in check
+        undo = self.make_move(piece, move)
+        check = self.is_in_check(piece.color)
+        self.unmake_move(undo)
+
+        return check
+
+    # ==================== PINS AND CHECKS ====================
+    def check_info(self, color):
+        # (checkers, evasion squares, pins) of color's king, computed once
+        # per position: evasion squares are the checker and the squares
+        # between it and the king (None when not in check), pins maps the
+        # index of an absolutely pinned piece to the squares of its pin ray
+        cache = self.check_cache
+        if cache is not None and cache[0] == self.zobrist_key and cache[1] == color:
+            return cache[2]
+        info = self._compute_check_info(color)
+        self.check_cache = (self.zobrist_key, color, info)
+        return info
+
+    def _compute_check_info(self, color):
+        king_square = self.kings.get(color)
+        if king_square is None:
+            return 0, None, {}
+        squares = self.squares
+        index = king_square.row * COLS + king_square.col
+        checkers, evasions, pins = 0, None, {}
+
+        for r, c in KNIGHT_TARGETS[index]:
+            p = squares[r][c].piece
+            if isinstance(p, Knight) and p.color != color:
+                checkers, evasions = checkers + 1, {r * COLS + c}
+        # enemy pawns attack the king from where the king's own pawn would capture
+        for r, c in PAWN_CAPTURES[color][index]:
+            p = squares[r][c].piece
+            if isinstance(p, Pawn) and p.color != color:
+                checkers, evasions = checkers + 1, {r * COLS + c}
+
+        for rays, kinds in ((STRAIGHT_RAYS[index], (Rook, Queen)), (DIAGONAL_RAYS[index], (Bishop, Queen))):
+            for ray in rays:
+                own = None
+                for i, (r, c) in enumerate(ray):
+                    p = squares[r][c].piece
+                    if p is None:
+                        continue
+                    if p.color == color:
+                        if own is not None:
+                            break
+                        own = r * COLS + c
+                    else:
+                        if isinstance(p, kinds):
+                            line = {rr * COLS + cc for rr, cc in ray[:i + 1]}
+                            if own is None:
+                                checkers, evasions = checkers + 1, line
+                            else:
+                                pins[own] = line
+                        break
+        return checkers, evasions, pins
+
+    def is_legal(self, piece, move, info=None):
+        # pseudo-legal move of piece's side -> legal, from the pins and
+        # checks; only king steps and en passant look at the board again
+        final = move.final
+        if isinstance(piece, King):
+            if abs(final.col - move.initial.col) == 2:
+                return True     # castling moves are generated fully checked
+            return not self._king_step_attacked(piece, final)
+        if move.code >> 12 == EN_PASSANT:
+            # the capture removes two pawns from one rank: trial move
+            return not self.in_check(piece, move)
+        checkers, evasions, pins = info if info is not None else self.check_info(piece.color)
+        target = final.row * COLS + final.col
+        if checkers:
+            if checkers > 1 or target not in evasions:
+                return False
+        pin = pins.get(move.initial.row * COLS + move.initial.col)
+        return pin is None or target in pin
+
+    def _king_step_attacked(self, king, final):
+        # the king is lifted so it does not shield the square behind it
+        king_square = self.kings[king.color]
+        king_square.piece = None
+        attacked = self.is_square_attacked(final, 'black' if king.color == 'white' else 'white')
+        king_square.piece = king
+        return attacked
 
 
     # ==================== MOVE CALCULATION ====================
-    def calc_moves(self, piece, row, col, bool=True):
-        def pawn_moves():
-            steps = 1 if piece.moved else 2
-            start = row + piece.dir
-            end = row + (piece.dir * steps)
-            direction = piece.dir
+    def calc_moves(self, piece, row, col, bool=True, castling=False):
+        # bool: drop moves that leave the king in check; castling is only
+        # generated (and always fully checked) with bool or castling set
+        squares = self.squares
+        index = row * COLS + col
+        initial = Square.at(row, col)
+        info = self.check_info(piece.color) if bool else None
+        legal = self.is_legal
+
+        def add_promotions(move):
+            # the queen promotion is tested; the others share its legality
+            flag = move.flag & ~3
+            piece.add_move(move)
+            for promotion in UNDERPROMOTIONS:
+                piece.add_move(Move(initial, move.final, flag | promotion))
 
-            for r in range(start, end + direction, direction):
-                if not Square.in_range(r):
-                    break
-                if self.squares[r][col].isempty():
-                    initial = Square(row, col)
-                    final = Square(r, col)
-                    move = Move(initial, final)
-                    if bool and self.in_check(piece, move):
+        def pawn_moves():
+            pushes = PAWN_PUSHES[piece.color][index]
+            for r, c in (pushes[:1] if piece.moved else pushes):
+                if squares[r][c].isempty():
+                    if r == 0 or r == 7:
+                        flag = PROMOTION | 3
+                    else:
+                        flag = DOUBLE_PUSH if abs(r - row) == 2 else QUIET
+                    move = Move(initial, Square.at(r, c), flag)
+                    if bool and not legal(piece, move, info):
                         continue
-                    piece.add_move(move)
+                    if flag & PROMOTION:
+                        add_promotions(move)
+                    else:
+                        piece.add_move(move)
                 else:
                     break
 
-            for dc in [-1, 1]:
-                r = row + direction
-                c = col + dc
-                if Square.in_range(r, c):
-                    if self.squares[r][c].has_enemy_piece(piece.color):
-                        initial = Square(row, col)
-                        final_piece = self.squares[r][c].piece
-                        final = Square(r, c, final_piece)
-                        move = Move(initial, final)
-                        if bool and self.in_check(piece, move):
-                            continue
+            captures = PAWN_CAPTURES[piece.color][index]
+            for r, c in captures:
+                if squares[r][c].has_enemy_piece(piece.color):
+                    flag = PROMOTION_CAPTURE | 3 if r == 0 or r == 7 else CAPTURE
+                    move = Move(initial, Square.at(r, c), flag)
+                    if bool and not legal(piece, move, info):
+                        continue
+                    if flag & PROMOTION:
+                        add_promotions(move)
+                    else:
                         piece.add_move(move)
 
             r_en_passant = 3 if piece.color == 'white' else 4
-            r_final = 2 if piece.color == 'white' else 5
             if row == r_en_passant:
-                for dc in [-1, 1]:
-                    c = col + dc
-                    if Square.in_range(c):
-                        sq = self.squares[row][c]
-                        if (sq.has_enemy_piece(piece.color) and 
-                            isinstance(sq.piece, Pawn) and 
-                            sq.piece.en_passant):
-                            initial = Square(row, col)
-                            final = Square(r_final, c)
-                            move = Move(initial, final)
-                            if bool and self.in_check(piece, move):
-                                continue
-                            piece.add_move(move)
-
-        def knight_moves():
-            deltas = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
-            for dr, dc in deltas:
-                r, c = row + dr, col + dc
-                if Square.in_range(r, c):
-                    if self.squares[r][c].isempty_or_enemy(piece.color):
-                        initial = Square(row, col)
-                        final_piece = self.squares[r][c].piece
-                        final = Square(r, c, final_piece)
-                        move = Move(initial, final)
-                        if bool and self.in_check(piece, move):
+                for r, c in captures:
+                    sq = squares[row][c]
+                    if (sq.has_enemy_piece(piece.color) and
+                        isinstance(sq.piece, Pawn) and
+                        sq.piece.en_passant):
+                        move = Move(initial, Square.at(r, c), EN_PASSANT)
+                        if bool and not legal(piece, move, info):
                             continue
                         piece.add_move(move)
 
-        def straightline_moves(directions):
-            for dr, dc in directions:
-                r, c = row + dr, col + dc
-                while Square.in_range(r, c):
-                    sq = self.squares[r][c]
-                    initial = Square(row, col)
-                    final_piece = sq.piece
-                    final = Square(r, c, final_piece)
-                    move = Move(initial, final)
-                    
+        def step_moves(targets):
+            for r, c in targets:
+                sq = squares[r][c]
+                if sq.isempty_or_enemy(piece.color):
+                    move = Move(initial, Square.at(r, c), CAPTURE if sq.has_piece() else QUIET)
+                    if bool and not legal(piece, move, info):
+                        continue
+                    piece.add_move(move)
+
+        def straightline_moves(rays):
+            for ray in rays:
+                for r, c in ray:
+                    sq = squares[r][c]
                     if sq.isempty():
-                        if bool and self.in_check(piece, move):
-                            pass
-                        else:
-                            piece.add_move(move)
-                    elif sq.has_enemy_piece(piece.color):
-                        if bool and self.in_check(piece, move):
-                            pass
-                        else:
+                        move = Move(initial, Square.at(r, c))
+                        if not (bool and not legal(piece, move, info)):
                             piece.add_move(move)
-                        break
                     else:
+                        if sq.has_enemy_piece(piece.color):
+                            move = Move(initial, Square.at(r, c), CAPTURE)
+                            if not (bool and not legal(piece, move, info)):
+                                piece.add_move(move)
                         break
-                    
-                    r += dr
-                    c += dc
 
         def king_moves():
-            adjs = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-            for dr, dc in adjs:
-                r, c = row + dr, col + dc
-                if Square.in_range(r, c):
-                    sq = self.squares[r][c]
-                    if sq.isempty_or_enemy(piece.color):
-                        initial = Square(row, col)
-                        final_piece = sq.piece
-                        final = Square(r, c, final_piece)
-                        move = Move(initial, final)
-                        if bool and self.in_check(piece, move):
-                            continue
-                        piece.add_move(move)
+            step_moves(KING_TARGETS[index])
 
             # Castling
-            if not bool:
+            if not (bool or castling):
                 return
                 
-            if not piece.moved:
+            if not piece.moved and not self.is_in_check(piece.color):
+                enemy = 'black' if piece.color == 'white' else 'white'
+
                 # Queenside (left) castling
-                left_rook = self.squares[row][0].piece
+                left_rook = squares[row][0].piece
                 if (isinstance(left_rook, Rook) and not left_rook.moved and
-                    all(self.squares[row][c].isempty() for c in range(1, 4))):
+                    all(squares[row][c].isempty() for c in range(1, 4))):
                     
-                    if not self.is_in_check(piece.color) and \
-                       not self.in_check(piece, Move(Square(row, col), Square(row, 2))):
-                        final_king = Square(row, 2)
-                        move_king = Move(Square(row, col), final_king)
+                    if not self.is_square_attacked(squares[row][3], enemy) and \
+                       not self.is_square_attacked(squares[row][2], enemy):
+                        move_king = Move(initial, Square.at(row, 2), QUEEN_CASTLE)
                         piece.add_move(move_king)
                         piece.left_rook = left_rook
 
                 # Kingside (right) castling
-                right_rook = self.squares[row][7].piece
+                right_rook = squares[row][7].piece
                 if (isinstance(right_rook, Rook) and not right_rook.moved and
-                    all(self.squares[row][c].isempty() for c in range(5, 7))):
+                    all(squares[row][c].isempty() for c in range(5, 7))):
                     
-                    if not self.is_in_check(piece.color) and \
-                       not self.in_check(piece, Move(Square(row, col), Square(row, 6))):
-                        final_king = Square(row, 6)
-                        move_king = Move(Square(row, col), final_king)
+                    if not self.is_square_attacked(squares[row][5], enemy) and \
+                       not self.is_square_attacked(squares[row][6], enemy):
+                        move_king = Move(initial, Square.at(row, 6), KING_CASTLE)
                         piece.add_move(move_king)
                         piece.right_rook = right_rook
 
@@ -256,47 +440,198 @@ class Board:
         if isinstance(piece, Pawn):
             pawn_moves()
         elif isinstance(piece, Knight):
-            knight_moves()
+            step_moves(KNIGHT_TARGETS[index])
         elif isinstance(piece, Bishop):
-            straightline_moves([(-1, -1), (-1, 1), (1, -1), (1, 1)])
+            straightline_moves(DIAGONAL_RAYS[index])
         elif isinstance(piece, Rook):
-            straightline_moves([(-1, 0), (0, 1), (1, 0), (0, -1)])
+            straightline_moves(STRAIGHT_RAYS[index])
         elif isinstance(piece, Queen):
-            straightline_moves([
-                (-1, -1), (-1, 0), (-1, 1),
-                (0, -1), (0, 1),
-                (1, -1), (1, 0), (1, 1)
-            ])
+            straightline_moves(QUEEN_RAYS[index])
         elif isinstance(piece, King):
             king_moves()
 
-    # ==================== GAME OVER ====================
-    def check_game_over(self, color):
-        has_legal_moves = False
+    def legal_moves(self, color):
+        # computed once per position and color; callers get their own copy to sort
+        return list(self._legal_moves(color))
+
+    def _legal_moves(self, color):
+        cache = self.legal_cache
+        if cache is not None and cache[0] == self.zobrist_key and cache[1] == color:
+            if self.debug:
+                assert cache[2] == self._generate_legal_moves(color), 'stale legal move cache'
+            return cache[2]
+        moves = self._generate_legal_moves(color)
+        self.legal_cache = (self.zobrist_key, color, moves)
+        return moves
+
+    def _generate_legal_moves(self, color):
+        moves = []
         for row in range(ROWS):
             for col in range(COLS):
-                square = self.squares[row][col]
-                if square.has_piece() and square.piece.color == color:
-                    piece = square.piece
+                piece = self.squares[row][col].piece
+                if piece is not None and piece.color == color:
                     self.calc_moves(piece, row, col)
-                    if piece.moves:
-                        has_legal_moves = True
-                        break
-            if has_legal_moves:
-                break
-        
-        if not has_legal_moves:
+                    moves.extend((piece, move) for move in piece.moves)
+        return moves
+
+    def _legal_set(self, color):
+        cache = self.legal_set
+        if cache is None or cache[0] != self.zobrist_key or cache[1] != color:
+            cache = self.legal_set = (self.zobrist_key, color, {move for _, move in self._legal_moves(color)})
+        return cache[2]
+
+    def piece_moves(self, piece):
+        # legal moves of one piece from the cache, also kept in piece.moves for the UI
+        piece.moves = [move for p, move in self._legal_moves(piece.color) if p is piece]
+        return piece.moves
+
+    # ==================== STAGED GENERATION ====================
+    def staged_moves(self, color, hash_move=0, killers=(), quiet_key=None, quiets=True):
+        # legal (piece, move) pairs generated lazily, in search order: the
+        # hash move, captures by MVV-LVA, killers, then the other moves
+        # (sorted by quiet_key if given). Legality is only tested when a
+        # move is about to be yielded, so a cutoff skips the rest.
+        done = -1
+        if hash_move:
+            pm = self._pseudo_move(color, hash_move)
+            if pm is not None and self.is_legal(*pm):
+                done = pm[1].code
+                yield pm
+
+        captures, others = self._pseudo_moves(color)
+        info = self.check_info(color)
+        legal = self.is_legal
+        captures.sort(key=self._mvv_lva, reverse=True)
+        for piece, move in captures:
+            if move.code != done and legal(piece, move, info):
+                yield piece, move
+        if not quiets:
+            return
+
+        skip = {done}
+        for killer in killers:
+            if killer is None or killer in skip:
+                continue
+            for piece, move in others:
+                if move.code == killer:
+                    skip.add(killer)
+                    if legal(piece, move, info):
+                        yield piece, move
+                    break
+        if quiet_key is not None:
+            others.sort(key=quiet_key, reverse=True)
+        for piece, move in others:
+            if move.code not in skip and legal(piece, move, info):
+                yield piece, move
+
+    def has_any_legal_move(self, color):
+        # stops at the first legal move instead of generating them all
+        cache = self.legal_cache
+        if cache is not None and cache[0] == self.zobrist_key and cache[1] == color:
+            return bool(cache[2])
+        info = self.check_info(color)
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = self.squares[row][col].piece
+                if piece is not None and piece.color == color:
+                    self.calc_moves(piece, row, col, False)
+                    for move in piece.moves:
+                        if self.is_legal(piece, move, info):
+                            return True
+        # castling is left out: it needs the king's step towards the rook
+        # to be legal, and the loop above finds that move first
+        return False
+
+    def _pseudo_moves(self, color):
+        # (captures, other moves) of color, king safety not tested
+        captures, others = [], []
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = self.squares[row][col].piece
+                if piece is not None and piece.color == color:
+                    self.calc_moves(piece, row, col, False, castling=True)
+                    for move in piece.moves:
+                        if move.code >> 12 & CAPTURE:
+                            captures.append((piece, move))
+                        else:
+                            others.append((piece, move))
+        return captures, others
+
+    def _pseudo_move(self, color, code):
+        # the generated (piece, Move) for a move code, if it is pseudo-legal here
+        piece, move = self.decode_move(code)
+        if piece is None or piece.color != color:
+            return None
+        self.calc_moves(piece, move.initial.row, move.initial.col, False, castling=True)
+        for generated in piece.moves:
+            if generated.code == code:
+                return piece, generated
+        return None
+
+    def _mvv_lva(self, pm):
+        # most valuable victim first, then the least valuable attacker
+        piece, move = pm
+        final = move.final
+        victim = self.squares[final.row][final.col].piece
+        if victim is None:
+            victim = self.squares[move.initial.row][final.col].piece     # en passant
+        return abs(victim.value) * 10 - PIECE_TYPES[piece.name]
+
+    # ==================== GAME OVER ====================
+    def check_game_over(self, color):
+        if not self.has_any_legal_move(color):
             if self.is_in_check(color):
                 return 'checkmate'
             else:
                 return 'stalemate'
+        if self.repetitions() >= 3:
+            return 'threefold'
+        if self.halfmove >= 100:
+            return 'fifty-move'
+        if self.insufficient_material():
+            return 'insufficient'
         return None
 
-    # ==================== BOARD SETUP ====================
-    def _create(self):
+    def repetitions(self):
+        # times the current position has occurred, this one included
+        return self.key_counts.get(self.zobrist_key, 0)
+
+    def insufficient_material(self):
+        # no sequence of legal moves can mate: bare kings, a single minor
+        # piece, or only bishops that all stand on one square color
+        minors = []
         for row in range(ROWS):
             for col in range(COLS):
-                self.squares[row][col] = Square(row, col)
+                piece = self.squares[row][col].piece
+                if piece is None or isinstance(piece, King):
+                    continue
+                if isinstance(piece, (Pawn, Rook, Queen)):
+                    return False
+                minors.append((piece, (row + col) % 2))
+        if len(minors) <= 1:
+            return True
+        return all(isinstance(p, Bishop) for p, _ in minors) and len({shade for _, shade in minors}) == 1
+
+    # ==================== BOARD SETUP ====================
+    def _clear(self):
+        self.last_move = None
+        self.en_passant_square = None
+        self.next_player = 'white'
+        self.halfmove = 0
+        self.fullmove = 1
+        self.kings = {}
+        self.observers = []
+        self.zobrist_key = 0
+        self.eval_material = self.eval_mg = self.eval_eg = self.eval_phase = 0
+        self.piece_count = 0        # pieces on the board, kings included
+        self.key_counts = {}        # key -> occurrences since the last irreversible move
+        self.legal_cache = None     # (zobrist key, color, [(piece, move)])
+        self.legal_set = None       # (zobrist key, color, {move})
+        self.check_cache = None     # (zobrist key, color, check_info)
+        self._create()
+
+    def _create(self):
+        self.squares = [[Square(row, col) for col in range(COLS)] for row in range(ROWS)]
 
     def _add_pieces(self, color):
         row_pawn, row_other = (6, 7) if color == 'white' else (1, 0)
@@ -314,4 +649,240 @@ class Board:
         self.squares[row_other][7] = Square(row_other, 7, Rook(color))
 
         self.squares[row_other][3] = Square(row_other, 3, Queen(color))
-        self.squares[row_other][4] = Square(row_other, 4, King(color))
\ No newline at end of file
+        self.squares[row_other][4] = Square(row_other, 4, King(color))
+
+    def _index_kings(self):
+        self.kings = {}
+        for row in range(ROWS):
+            for col in range(COLS):
+                square = self.squares[row][col]
+                if isinstance(square.piece, King):
+                    self.kings[square.piece.color] = square
+
+    # ==================== EVALUATION ====================
+    def compute_eval(self):
+        # (material, midgame, endgame, phase) summed over the board, in millipawns
+        material = mg = eg = phase = 0
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = self.squares[row][col].piece
+                if piece is not None:
+                    index = self._piece_index(piece)
+                    sq = square_index(row, col)
+                    material += PIECE_VALUES[index]
+                    mg += PIECE_SQUARE_MG[index][sq]
+                    eg += PIECE_SQUARE_EG[index][sq]
+                    phase += PIECE_PHASE[index]
+        return material, mg, eg, phase
+
+    def _piece_index(self, piece):
+        return (6 if piece.color == 'black' else 0) + PIECE_TYPES[piece.name]
+
+    def _eval_add(self, piece, square):
+        index = self._piece_index(piece)
+        sq = (7 - square.row) * 8 + square.col
+        self.eval_material += PIECE_VALUES[index]
+        self.eval_mg += PIECE_SQUARE_MG[index][sq]
+        self.eval_eg += PIECE_SQUARE_EG[index][sq]
+        self.eval_phase += PIECE_PHASE[index]
+
+    def _eval_remove(self, piece, square):
+        index = self._piece_index(piece)
+        sq = (7 - square.row) * 8 + square.col
+        self.eval_material -= PIECE_VALUES[index]
+        self.eval_mg -= PIECE_SQUARE_MG[index][sq]
+        self.eval_eg -= PIECE_SQUARE_EG[index][sq]
+        self.eval_phase -= PIECE_PHASE[index]
+
+    def _eval_move(self, piece, initial, final):
+        # material and phase do not change
+        index = self._piece_index(piece)
+        a, b = (7 - initial.row) * 8 + initial.col, (7 - final.row) * 8 + final.col
+        mg, eg = PIECE_SQUARE_MG[index], PIECE_SQUARE_EG[index]
+        self.eval_mg += mg[b] - mg[a]
+        self.eval_eg += eg[b] - eg[a]
+
+    # ==================== HASHING ====================
+    def key(self):
+        return self.zobrist_key
+
+    def compute_key(self):
+        key = 0
+        for row in range(ROWS):
+            for col in range(COLS):
+                square = self.squares[row][col]
+                if square.has_piece():
+                    key ^= self._piece_key(square.piece, square)
+        if self.next_player == 'black':
+            key ^= SIDE_KEY
+        key ^= CASTLING_KEYS[self.castling_rights()]
+        if self.en_passant_square is not None:
+            key ^= EN_PASSANT_KEYS[self.en_passant_square.col]
+        return key
+
+    def castling_rights(self):
+        # rights implied by unmoved kings and rooks on their home squares
+        rights = 0
+        for row, bits in ((7, (WHITE_OOO, WHITE_OO)), (0, (BLACK_OOO, BLACK_OO))):
+            king = self.squares[row][4].piece
+            if isinstance(king, King) and not king.moved:
+                for col, right in zip((0, 7), bits):
+                    rook = self.squares[row][col].piece
+                    if isinstance(rook, Rook) and not rook.moved and rook.color == king.color:
+                        rights |= right
+        return rights
+
+    def _piece_key(self, piece, square):
+        index = piece_index(0 if piece.color == 'white' else 1, PIECE_TYPES[piece.name])
+        return PIECE_KEYS[index][square_index(square.row, square.col)]
+
+    # ==================== FEN ====================
+    @classmethod
+    def from_fen(cls, fen):
+        fields = fen.split()
+        board = cls.__new__(cls)
+        board._clear()
+        squares = board.squares
+
+        ranks = fields[0].split('/') if fields else ()
+        if len(ranks) != 8:
+            raise ValueError(f'FEN placement {fen!r} does not have 8 ranks')
+        for row, text in enumerate(ranks):
+            for col, piece in enumerate(fen_rank(text)[0]):
+                if piece is not None:
+                    board._place(piece, row, col)
+        if set(board.kings) != {'white', 'black'}:
+            raise ValueError(f'FEN placement {fields[0]!r} needs a king of each color')
+
+        board.next_player = 'black' if len(fields) > 1 and fields[1] == 'b' else 'white'
+        castling = 0
+        if len(fields) > 2:
+            for ch in fields[2]:
+                castling |= FEN_CASTLING.get(ch, 0)
+        ep = None
+        if len(fields) > 3 and fields[3] != '-':
+            ep = square_index(8 - int(fields[3][1]), ord(fields[3][0]) - ord('a'))
+        if len(fields) > 5:
+            board.halfmove, board.fullmove = int(fields[4]), int(fields[5])
+        board._finish_setup(castling, ep)
+        return board
+
+    def to_fen(self):
+        rows = []
+        for row in range(ROWS):
+            fen_row, empty = '', 0
+            for col in range(COLS):
+                piece = self.squares[row][col].piece
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    fen_row += str(empty)
+                    empty = 0
+                letter = 'nbrqk'[PIECE_TYPES[piece.name] - 1] if piece.name != 'pawn' else 'p'
+                fen_row += letter.upper() if piece.color == 'white' else letter
+            rows.append(fen_row + (str(empty) if empty else ''))
+
+        rights = self.castling_rights()
+        castling = ''.join(ch for ch, bit in FEN_CASTLING.items() if rights & bit) or '-'
+        ep = '-'
+        if self.en_passant_square is not None:
+            sq = self.en_passant_square
+            ep = square_name(square_index(sq.row - sq.piece.dir, sq.col))
+        side = 'w' if self.next_player == 'white' else 'b'
+        return f"{'/'.join(rows)} {side} {castling} {ep} {self.halfmove} {self.fullmove}"
+
+    def _place(self, piece_idx, row, col):
+        color, ptype = divmod(piece_idx, 6)
+        piece = PIECE_CLASSES[ptype](COLORS[color])
+        if ptype == PAWN:
+            piece.moved = row != (6 if color == WHITE else 1)
+        elif ptype == KING or ptype == ROOK:
+            # only pieces that keep a castling right count as unmoved
+            piece.moved = True
+            if ptype == KING:
+                self.kings[piece.color] = self.squares[row][col]
+        self.squares[row][col].piece = piece
+        self.piece_count += 1
+        self.zobrist_key ^= PIECE_KEYS[piece_idx][square_index(row, col)]
+
+    def _finish_setup(self, castling, ep):
+        for row, color, rights in ((7, 'white', (WHITE_OOO, WHITE_OO)), (0, 'black', (BLACK_OOO, BLACK_OO))):
+            king = self.squares[row][4].piece
+            for col, right in zip((0, 7), rights):
+                rook = self.squares[row][col].piece
+                # a right without its king and rook at home is dropped
+                if castling & right and isinstance(king, King) and king.color == color \
+                        and isinstance(rook, Rook) and rook.color == color:
+                    king.moved = False
+                    rook.moved = False
+
+        if ep is not None:
+            row, col = square_row_col(ep)
+            pawn_row = row + 1 if self.next_player == 'white' else row - 1
+            pawn = self.squares[pawn_row][col].piece if row == (2 if self.next_player == 'white' else 5) else None
+            if not isinstance(pawn, Pawn) or pawn.color == self.next_player:
+                raise ValueError(f'en passant square {square_name(ep)} has no pawn that just moved two squares')
+            pawn.en_passant = True
+            self.en_passant_square = self.squares[pawn_row][col]
+            self.zobrist_key ^= EN_PASSANT_KEYS[col]
+
+        self.zobrist_key ^= CASTLING_KEYS[self.castling_rights()]
+        if self.next_player == 'black':
+            self.zobrist_key ^= SIDE_KEY
+        self.eval_material, self.eval_mg, self.eval_eg, self.eval_phase = self.compute_eval()
+        self.key_counts = {self.zobrist_key: 1}
+
+    # ==================== POSITION CONVERSION ====================
+    def copy(self):
+        # an independent board in the same position, repetition history included
+        board = Board.from_fen(self.to_fen())
+        board.key_counts = dict(self.key_counts)
+        return board
+
+    def square_codes(self):
+        # 64 ints, a1=0: piece type + 1 for white, negated for black, 0 when empty
+        codes = [0] * 64
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = self.squares[row][col].piece
+                if piece is not None:
+                    code = PIECE_TYPES[piece.name] + 1
+                    codes[square_index(row, col)] = code if piece.color == 'white' else -code
+        return codes
+
+    def to_position(self):
+        pos = Position()
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = self.squares[row][col].piece
+                if piece is not None:
+                    color = WHITE if piece.color == 'white' else BLACK
+                    sq = square_index(row, col)
+                    pos.put(piece_index(color, PIECE_TYPES[piece.name]), sq)
+                    if isinstance(piece, Pawn) and piece.en_passant:
+                        pos.ep = sq - 8 if color == WHITE else sq + 8
+
+        pos.side = WHITE if self.next_player == 'white' else BLACK
+        pos.castling = self.castling_rights()
+        pos.halfmove, pos.fullmove = self.halfmove, self.fullmove
+        return pos
+
+    @classmethod
+    def from_position(cls, pos):
+        board = cls.__new__(cls)
+        board._clear()
+        for sq in range(64):
+            if pos.mailbox[sq] is not None:
+                board._place(pos.mailbox[sq], *square_row_col(sq))
+        board.next_player = COLORS[pos.side]
+        board.halfmove, board.fullmove = pos.halfmove, pos.fullmove
+        board._finish_setup(pos.castling, pos.ep)
+        return board
+
+    def decode_move(self, move):
+        # position move -> (piece, Move) on this board
+        initial_row, initial_col = square_row_col(move_from(move))
+        final_row, final_col = square_row_col(move_to(move))
+        piece = self.squares[initial_row][initial_col].piece
+        return piece, Move(Square.at(initial_row, initial_col), Square.at(final_row, final_col), move_flag(move))
@@ -0,0 +1,213 @@
+"""
+Opening book in the Polyglot file layout.
+
+    python src/book.py build games.pgn more.pgn -o book.bin --plies 20
+    python src/book.py probe book.bin --fen "<fen>"
+
+The book is a sorted array of 16-byte big-endian entries
+(key u64, move u16, weight u16, learn u32), opened with mmap and
+searched by bisection, so opening it costs the same for any book size
+and only the pages that are read come into memory. Moves are encoded
+like Polyglot (to | from << 6 | promotion << 12, castling as the king
+taking its rook). The keys are Board.key(), not the Polyglot Random64
+keys, so books built by other tools do not match our positions.
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+
+from board import Board
+from move import Move
+from square import Square
+from piece import King
+from position import PROMOTION, PROMOTION_CAPTURE, CAPTURE
+import pgn
+
+ENTRY = struct.Struct('>QHHI')
+KEY = struct.Struct('>Q')
+MAX_WEIGHT = 0xFFFF
+
+
+# ==================== MOVE ENCODING ====================
+def encode_move(piece, move):
+    # Board move -> Polyglot move
+    initial, final = move.initial, move.final
+    to_col = final.col
+    if isinstance(piece, King) and abs(final.col - initial.col) == 2:
+        to_col = 7 if final.col > initial.col else 0
+    code = (7 - final.row) * 8 + to_col | ((7 - initial.row) * 8 + initial.col) << 6
+    if move.flag & PROMOTION:
+        code |= ((move.flag & 3) + 1) << 12
+    return code
+
+def decode_move(board, code):
+    # Polyglot move -> (piece, Move) on board, or None if not legal here
+    to_sq, from_sq, promotion = code & 63, (code >> 6) & 63, (code >> 12) & 7
+    row, col = 7 - (from_sq >> 3), from_sq & 7
+    to_row, to_col = 7 - (to_sq >> 3), to_sq & 7
+    piece = board.squares[row][col].piece
+    if piece is None or piece.color != board.next_player:
+        return None
+    if isinstance(piece, King) and col == 4 and to_row == row and to_col in (0, 7):
+        to_col = 6 if to_col == 7 else 2
+    for move in board.piece_moves(piece):
+        if move.final.row == to_row and move.final.col == to_col:
+            if promotion:
+                capture = move.flag & CAPTURE
+                return piece, Move(Square.at(row, col), Square.at(to_row, to_col),
+                                   (PROMOTION_CAPTURE if capture else PROMOTION) | (promotion - 1))
+            return piece, move
+    return None
+
+
+# ==================== READER ====================
+class OpeningBook:
+    """
+    Read-only view of a book file. entries(key) bisects the mapped file
+    for the first entry with the key; the entries of one position are
+    adjacent.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        if size % ENTRY.size:
+            self.file.close()
+            raise ValueError(f'{path}: size {size} is not a multiple of {ENTRY.size} bytes')
+        self.count = size // ENTRY.size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def entries(self, key):
+        # [(polyglot move, weight)] stored for key
+        data, lo, hi = self.data, 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if KEY.unpack_from(data, mid * ENTRY.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        while lo < self.count:
+            entry_key, move, weight, _ = ENTRY.unpack_from(data, lo * ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((move, weight))
+            lo += 1
+        return found
+
+    def moves(self, board):
+        # [(piece, move, weight)] of the book moves legal on board
+        found = []
+        for code, weight in self.entries(board.key()):
+            decoded = decode_move(board, code)
+            if decoded is not None:
+                found.append((*decoded, weight))
+        return found
+
+    def choose(self, board, rng=random):
+        # a book move picked with probability proportional to its weight, or None
+        moves = [m for m in self.moves(board) if m[2] > 0]
+        if not moves:
+            return None
+        piece, move, _ = rng.choices(moves, weights=[m[2] for m in moves])[0]
+        return piece, move
+
+
+def open_book(path):
+    # the book at path, or None if there is no such file
+    try:
+        return OpeningBook(path)
+    except FileNotFoundError:
+        return None
+
+
+# ==================== BUILDER ====================
+def collect(games, plies=20):
+    # {(key, polyglot move): weight} from (tags, sans, result) games:
+    # a win counts 2 for the side that played the move, a draw 1
+    weights = {}
+    for tags, sans, result in games:
+        points = {'1-0': (2, 0), '0-1': (0, 2), '1/2-1/2': (1, 1)}.get(result)
+        if points is None:
+            continue
+        try:
+            board = pgn.start_board(tags)
+            for text in sans[:plies]:
+                key = board.key()
+                piece, move = pgn.parse_san(board, text)
+                weight = points[0 if piece.color == 'white' else 1]
+                entry = (key, encode_move(piece, move))
+                weights[entry] = weights.get(entry, 0) + weight
+                board.move(piece, move, testing=True)
+        except ValueError:
+            continue    # keep the moves before the bad one
+    return weights
+
+def write_book(weights, path, min_weight=1):
+    # sorted Polyglot entries; weights are scaled down to fit 16 bits
+    entries = sorted((key, move, weight) for (key, move), weight in weights.items() if weight >= min_weight)
+    top = max((weight for _, _, weight in entries), default=0)
+    scale = MAX_WEIGHT / top if top > MAX_WEIGHT else 1
+    with open(path, 'wb') as f:
+        for key, move, weight in entries:
+            f.write(ENTRY.pack(key, move, max(1, int(weight * scale)), 0))
+    return len(entries)
+
+def build(pgn_paths, path, plies=20, min_weight=1):
+    def games():
+        for name in pgn_paths:
+            with open(name, encoding='utf-8', errors='replace') as f:
+                yield from pgn.read_games(f)
+    return write_book(collect(games(), plies), path, min_weight)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Opening book builder and probe.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    b = sub.add_parser('build', help='build a book from PGN files')
+    b.add_argument('pgn', nargs='+')
+    b.add_argument('-o', '--output', required=True)
+    b.add_argument('--plies', type=int, default=20, help='book depth in plies')
+    b.add_argument('--min-weight', type=int, default=1, help='drop moves with a smaller weight')
+
+    p = sub.add_parser('probe', help='list the book moves of a position')
+    p.add_argument('book')
+    p.add_argument('--fen', help='position (default: initial position)')
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        count = build(args.pgn, args.output, args.plies, args.min_weight)
+        print(f'{args.output}: {count} entries')
+    else:
+        board = Board.from_fen(args.fen) if args.fen else Board()
+        with OpeningBook(args.book) as book:
+            moves = book.moves(board)
+            total = sum(weight for _, _, weight in moves) or 1
+            for piece, move, weight in sorted(moves, key=lambda m: -m[2]):
+                print(f'{pgn.san(board, piece, move):8} {weight:6} {100 * weight / total:5.1f}%')
+            if not moves:
+                print('no book moves')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
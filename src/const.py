@@ -9,3 +9,22 @@ ROWS = 8
 
 COLS = 8
 SQSIZE = WIDTH // COLS
+
+#AI search budget (seconds per move)
+AI_MOVE_TIME = 1.0
+AI_HASH_MB = 16
+#Processes searching each move (above 1: Lazy SMP, see src/parallel.py)
+AI_WORKERS = 1
+
+#Opening book in the assets folder, built with src/book.py (optional)
+BOOK_FILE = 'book.bin'
+
+#Endgame tablebases in the assets folder, built with src/tablebase.py (optional)
+TABLEBASE_DIR = 'tablebases'
+
+#File written by the save game key (S)
+PGN_FILE = 'partida.pgn'
+
+#Frame rate limit and idle mode (block on events while nothing animates)
+FPS = 60
+IDLE_WAIT = True
@@ -1,10 +1,9 @@
-import pygame
-
 from const import *
 
 class Dragger:
 
-    def __init__(self):
+    def __init__(self, assets):
+        self.assets = assets
         self.piece = None
         self.dragging = False
         self.mouseX = 0
@@ -15,11 +14,8 @@ class Dragger:
     # blit method
 
     def update_blit(self, surface):
-        # texture
-        self.piece.set_texture(size=128)
-        texture = self.piece.texture
-        # img
-        img = pygame.image.load(texture)
+        # img (preloaded texture)
+        img = self.assets.texture(self.piece.color, self.piece.name, 128)
         # rect
         img_center = (self.mouseX, self.mouseY)
         self.piece.texture_rect = img.get_rect(center=img_center)
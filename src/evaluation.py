@@ -0,0 +1,153 @@
+from const import *
+
+def material(board):
+    # sum of Piece.value over the board, positive when white is ahead
+    total = 0.0
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = board.squares[row][col].piece
+            if piece is not None:
+                total += piece.value
+    # the kings cancel out; rounding drops the float noise they leave
+    return round(total, 3)
+
+def evaluate(board):
+    # score from the point of view of the side to move: material and
+    # tapered piece-square tables, kept up to date by Board.make_move
+    score = incremental_score(board.eval_material, board.eval_mg, board.eval_eg, board.eval_phase)
+    return score if board.next_player == 'white' else -score
+
+
+# ==================== EVALUATION TERMS ====================
+# Piece-square tables in centipawns from white's side, written with rank 8
+# on top like a diagram. PST[ptype][sq] is in pawns with a1=0 numbering;
+# black uses the square mirrored vertically (sq ^ 56).
+def _table(rows):
+    return [rows[7 - (sq >> 3)][sq & 7] / 100 for sq in range(64)]
+
+PAWN_MG = _table([
+    [  0,   0,   0,   0,   0,   0,   0,   0],
+    [ 50,  50,  50,  50,  50,  50,  50,  50],
+    [ 10,  10,  20,  30,  30,  20,  10,  10],
+    [  5,   5,  10,  25,  25,  10,   5,   5],
+    [  0,   0,   0,  20,  20,   0,   0,   0],
+    [  5,  -5, -10,   0,   0, -10,  -5,   5],
+    [  5,  10,  10, -20, -20,  10,  10,   5],
+    [  0,   0,   0,   0,   0,   0,   0,   0],
+])
+PAWN_EG = _table([
+    [  0,   0,   0,   0,   0,   0,   0,   0],
+    [ 80,  80,  80,  80,  80,  80,  80,  80],
+    [ 50,  50,  50,  50,  50,  50,  50,  50],
+    [ 30,  30,  30,  30,  30,  30,  30,  30],
+    [ 15,  15,  15,  15,  15,  15,  15,  15],
+    [  5,   5,   5,   5,   5,   5,   5,   5],
+    [  0,   0,   0,   0,   0,   0,   0,   0],
+    [  0,   0,   0,   0,   0,   0,   0,   0],
+])
+KNIGHT_PST = _table([
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+    [-40, -20,   0,   0,   0,   0, -20, -40],
+    [-30,   0,  10,  15,  15,  10,   0, -30],
+    [-30,   5,  15,  20,  20,  15,   5, -30],
+    [-30,   0,  15,  20,  20,  15,   0, -30],
+    [-30,   5,  10,  15,  15,  10,   5, -30],
+    [-40, -20,   0,   5,   5,   0, -20, -40],
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+])
+BISHOP_PST = _table([
+    [-20, -10, -10, -10, -10, -10, -10, -20],
+    [-10,   0,   0,   0,   0,   0,   0, -10],
+    [-10,   0,   5,  10,  10,   5,   0, -10],
+    [-10,   5,   5,  10,  10,   5,   5, -10],
+    [-10,   0,  10,  10,  10,  10,   0, -10],
+    [-10,  10,  10,  10,  10,  10,  10, -10],
+    [-10,   5,   0,   0,   0,   0,   5, -10],
+    [-20, -10, -10, -10, -10, -10, -10, -20],
+])
+ROOK_PST = _table([
+    [  0,   0,   0,   0,   0,   0,   0,   0],
+    [  5,  10,  10,  10,  10,  10,  10,   5],
+    [ -5,   0,   0,   0,   0,   0,   0,  -5],
+    [ -5,   0,   0,   0,   0,   0,   0,  -5],
+    [ -5,   0,   0,   0,   0,   0,   0,  -5],
+    [ -5,   0,   0,   0,   0,   0,   0,  -5],
+    [ -5,   0,   0,   0,   0,   0,   0,  -5],
+    [  0,   0,   0,   5,   5,   0,   0,   0],
+])
+QUEEN_PST = _table([
+    [-20, -10, -10,  -5,  -5, -10, -10, -20],
+    [-10,   0,   0,   0,   0,   0,   0, -10],
+    [-10,   0,   5,   5,   5,   5,   0, -10],
+    [ -5,   0,   5,   5,   5,   5,   0,  -5],
+    [  0,   0,   5,   5,   5,   5,   0,  -5],
+    [-10,   5,   5,   5,   5,   5,   0, -10],
+    [-10,   0,   5,   0,   0,   0,   0, -10],
+    [-20, -10, -10,  -5,  -5, -10, -10, -20],
+])
+KING_MG = _table([
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-20, -30, -30, -40, -40, -30, -30, -20],
+    [-10, -20, -20, -20, -20, -20, -20, -10],
+    [ 20,  20,   0,   0,   0,   0,  20,  20],
+    [ 20,  30,  10,   0,   0,  10,  30,  20],
+])
+KING_EG = _table([
+    [-50, -40, -30, -20, -20, -30, -40, -50],
+    [-30, -20, -10,   0,   0, -10, -20, -30],
+    [-30, -10,  20,  30,  30,  20, -10, -30],
+    [-30, -10,  30,  40,  40,  30, -10, -30],
+    [-30, -10,  30,  40,  40,  30, -10, -30],
+    [-30, -10,  20,  30,  30,  20, -10, -30],
+    [-30, -30,   0,   0,   0,   0, -30, -30],
+    [-50, -30, -30, -30, -30, -30, -30, -50],
+])
+
+# indexed by piece type (pawn .. king)
+PST_MG = (PAWN_MG, KNIGHT_PST, BISHOP_PST, ROOK_PST, QUEEN_PST, KING_MG)
+PST_EG = (PAWN_EG, KNIGHT_PST, BISHOP_PST, ROOK_PST, QUEEN_PST, KING_EG)
+
+# game phase: 24 with all minor and major pieces on the board, 0 with none
+PHASE_WEIGHTS = (0, 1, 1, 2, 4, 0)
+MAX_PHASE = 24
+
+# per attacked square not holding an own piece (knight, bishop, rook, queen)
+MOBILITY_WEIGHTS = (0.0, 0.04, 0.05, 0.02, 0.01, 0.0)
+
+DOUBLED_PAWN = -0.10        # per pawn beyond the first on a file
+ISOLATED_PAWN = -0.15
+# passed pawn bonus by rank counted from the pawn's own side (0 = first rank)
+PASSED_PAWN = (0.0, 0.05, 0.10, 0.20, 0.35, 0.60, 1.00, 0.0)
+
+def tapered(mg, eg, phase):
+    # blend of the midgame and endgame scores by the remaining material
+    phase = min(phase, MAX_PHASE)
+    return (mg * phase + eg * (MAX_PHASE - phase)) / MAX_PHASE
+
+
+# ==================== INCREMENTAL TERMS ====================
+# Board keeps material and the piece-square sums up to date in integer
+# millipawns, so deltas never drift. Indexed by piece index (white pawn ..
+# black king, like the bitboard core) and a1=0 square, sign included.
+def _signed(values_of):
+    return [[round(1000 * values_of(ptype)[sq if color == 0 else sq ^ 56]) * (1 if color == 0 else -1)
+             for sq in range(64)]
+            for color in (0, 1) for ptype in range(6)]
+
+def _material_values():
+    # Piece.value without the kings, which cancel
+    from piece import Pawn, Knight, Bishop, Rook, Queen
+    values = [round(1000 * cls('white').value) for cls in (Pawn, Knight, Bishop, Rook, Queen)] + [0]
+    return values + [-v for v in values]
+
+PIECE_VALUES = _material_values()
+PIECE_SQUARE_MG = _signed(lambda ptype: PST_MG[ptype])
+PIECE_SQUARE_EG = _signed(lambda ptype: PST_EG[ptype])
+PIECE_PHASE = PHASE_WEIGHTS * 2
+
+def incremental_score(material, mg, eg, phase):
+    # pawns, white's point of view, from Board's running sums
+    return (material + tapered(mg, eg, phase)) / 1000
@@ -0,0 +1,51 @@
+from board import Board
+from pgn import san, format_game, START_FEN
+
+class GameState:
+    """
+    Rules-only game: the board, whose turn it is and the result.
+    Imports nothing from pygame, so it can run engine games headless.
+    Every move is also recorded in SAN, so the game can be saved as PGN.
+    """
+
+    def __init__(self, board=None):
+        self.board = board if board is not None else Board()
+        self.next_player = self.board.next_player
+        self.game_over = False
+        self.winner = None
+        self.termination = None     # 'checkmate', 'stalemate', 'threefold', 'fifty-move' or 'insufficient'
+        self.last_move = None
+        self.start_fen = self.board.to_fen()
+        self.sans = []
+
+    def play_move(self, piece, move):
+        # SAN depende da posição antes do lance
+        self.sans.append(san(self.board, piece, move))
+        self.board.move(piece, move)
+        self.last_move = move
+        self.next_player = 'black' if self.next_player == 'white' else 'white'
+        
+        # Verifica a condição de fim de jogo após a jogada
+        game_state = self.board.check_game_over(self.next_player)
+        if game_state:
+            self.game_over = True
+            self.termination = game_state
+            if game_state == 'checkmate':
+                self.winner = 'white' if self.next_player == 'black' else 'black'
+            else: # empate: afogamento, repetição, 50 lances ou material insuficiente
+                self.winner = None
+
+    def result(self):
+        if self.winner:
+            return '1-0' if self.winner == 'white' else '0-1'
+        return '1/2-1/2' if self.game_over else '*'
+
+    def pgn(self, tags=None, result=None):
+        # PGN text of the moves played so far
+        tags = dict(tags or {})
+        fields = self.start_fen.split()
+        if self.start_fen != START_FEN:
+            tags.setdefault('SetUp', '1')
+            tags.setdefault('FEN', self.start_fen)
+        color = 'white' if fields[1] == 'w' else 'black'
+        return format_game(tags, self.sans, result or self.result(), int(fields[5]), color)
@@ -1,9 +1,32 @@
+from position import QUIET
+
+# from | to << 6, the part of the code that identifies a move on the board
+SQUARES_MASK = 0xFFF
+
 class Move:
-    def __init__(self, initial, final):
+
+    __slots__ = ('initial', 'final', 'code')
+
+    def __init__(self, initial, final, flag=QUIET):
         #initial and final are squares
         self.initial = initial
         self.final = final
+        # 16 bit code like the bitboard core: from | to << 6 | flag << 12,
+        # squares numbered a1=0 .. h8=63
+        self.code = (7 - initial.row) * 8 + initial.col | \
+                    ((7 - final.row) * 8 + final.col) << 6 | flag << 12
 
     def __eq__(self, other):
-        return self.initial == other.initial and self.final == other.final
-    
\ No newline at end of file
+        # the flags only describe the move, so a move built from two clicks
+        # equals the generated one
+        return (self.code ^ other.code) & SQUARES_MASK == 0
+
+    def __hash__(self):
+        return self.code & SQUARES_MASK
+
+    @property
+    def flag(self):
+        return self.code >> 12
+
+    def encode(self):
+        return self.code
@@ -0,0 +1,60 @@
+"""
+Move tables for the Board generator, indexed by row * 8 + col.
+
+Every entry is a tuple of (row, col) targets already inside the board,
+so the generator never does coordinate arithmetic or range checks.
+Built once at import; that costs a few milliseconds, about as much as
+the bitboard tables, so there is no file cache.
+"""
+
+KNIGHT_DELTAS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_DELTAS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+STRAIGHT_DIRS = ((-1, 0), (0, 1), (1, 0), (0, -1))
+DIAGONAL_DIRS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+QUEEN_DIRS = KING_DELTAS
+
+PAWN_DIR = {'white': -1, 'black': 1}
+
+
+def _targets(row, col, deltas):
+    return tuple((row + dr, col + dc) for dr, dc in deltas
+                 if 0 <= row + dr < 8 and 0 <= col + dc < 8)
+
+def _ray(row, col, dr, dc):
+    ray = []
+    r, c = row + dr, col + dc
+    while 0 <= r < 8 and 0 <= c < 8:
+        ray.append((r, c))
+        r, c = r + dr, c + dc
+    return tuple(ray)
+
+def _rays(row, col, directions):
+    # empty rays are dropped
+    return tuple(ray for ray in (_ray(row, col, dr, dc) for dr, dc in directions) if ray)
+
+def _pawn_pushes(row, col, color):
+    # one step, then the double step from the starting row
+    step = PAWN_DIR[color]
+    if not 0 <= row + step < 8:
+        return ()
+    start = 6 if color == 'white' else 1
+    if row == start:
+        return ((row + step, col), (row + 2 * step, col))
+    return ((row + step, col),)
+
+def _pawn_captures(row, col, color):
+    step = PAWN_DIR[color]
+    return _targets(row, col, ((step, -1), (step, 1)))
+
+
+SQUARES = [(row, col) for row in range(8) for col in range(8)]
+
+KNIGHT_TARGETS = [_targets(row, col, KNIGHT_DELTAS) for row, col in SQUARES]
+KING_TARGETS = [_targets(row, col, KING_DELTAS) for row, col in SQUARES]
+PAWN_PUSHES = {color: [_pawn_pushes(row, col, color) for row, col in SQUARES] for color in PAWN_DIR}
+PAWN_CAPTURES = {color: [_pawn_captures(row, col, color) for row, col in SQUARES] for color in PAWN_DIR}
+
+# rays ordered outwards from the square, one tuple per direction
+STRAIGHT_RAYS = [_rays(row, col, STRAIGHT_DIRS) for row, col in SQUARES]
+DIAGONAL_RAYS = [_rays(row, col, DIAGONAL_DIRS) for row, col in SQUARES]
+QUEEN_RAYS = [_rays(row, col, QUEEN_DIRS) for row, col in SQUARES]
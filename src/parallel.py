@@ -0,0 +1,129 @@
+"""
+Lazy SMP: several processes search the same root and share one
+transposition table.
+
+    search = ParallelSearch(workers=4, max_time=1.0)
+    piece, move = search.run(board)
+    search.close()
+
+The calling process searches like Search does; workers - 1 helper
+processes (spawned once, reused for every move) search the same
+position at the same time, half of them one ply deeper, and meet the
+main search only through the SharedTranspositionTable, where their
+results cut its tree short. When the main search stops, the helpers are
+stopped and the deepest finished iteration of any process is played.
+Limits are the main search's: max_nodes counts its own nodes, and the
+helpers stop with it. bench.py smp measures the speedup.
+"""
+import multiprocessing
+import queue
+import time
+
+from board import Board
+from search import Search
+from transposition import SharedTranspositionTable
+
+
+class _Helper(Search):
+    # a Search that also stops when the main process sets the event
+
+    def __init__(self, stop_event, **kwargs):
+        super().__init__(**kwargs)
+        self.stop_event = stop_event
+
+    def _check_limits(self):
+        return self.stop_event.is_set() or super()._check_limits()
+
+
+def _helper(index, tt_name, hash_mb, tablebase_dir, jobs, results, stop_event):
+    # helper process: one search per job until it gets None
+    tt = SharedTranspositionTable(hash_mb, tt_name)
+    tablebases = None
+    if tablebase_dir is not None:
+        from tablebase import Tablebases
+        tablebases = Tablebases(tablebase_dir)
+    search = _Helper(stop_event, tt=tt, tablebases=tablebases)
+    search.start_depth = 1 + index % 2
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        fen, key_counts, max_depth, max_time = job
+        board = Board.from_fen(fen)
+        board.key_counts = key_counts
+        search.max_depth, search.max_time = max_depth, max_time
+        best = search.run(board)
+        results.put((index, search.depth, search.score, search.nodes, best[1].encode() if best else 0))
+    tt.close()
+
+
+class ParallelSearch(Search):
+    """
+    Search with helper processes (see the module docstring). Takes the
+    Search limits plus the number of workers, the calling process
+    included; close() stops the helpers and frees the shared table.
+    """
+
+    def __init__(self, workers=2, max_depth=64, max_nodes=None, max_time=None, info=None,
+                 hash_mb=16, tablebases=None):
+        self.shared = SharedTranspositionTable(hash_mb)
+        super().__init__(max_depth, max_nodes, max_time, info, hash_mb, tablebases, tt=self.shared)
+        self.workers = max(1, workers)
+        self.helper_nodes = 0
+        # spawn, not fork: the game runs searches from a thread
+        context = multiprocessing.get_context('spawn')
+        self.stop_event = context.Event()
+        self.results = context.Queue()
+        self.jobs = []
+        self.helpers = []
+        tablebase_dir = tablebases.directory if tablebases is not None else None
+        for index in range(1, self.workers):
+            jobs = context.Queue()
+            helper = context.Process(target=_helper, daemon=True,
+                                     args=(index, self.shared.name, hash_mb, tablebase_dir,
+                                           jobs, self.results, self.stop_event))
+            helper.start()
+            self.jobs.append(jobs)
+            self.helpers.append(helper)
+
+    def run(self, board):
+        self.stop_event.clear()
+        job = (board.to_fen(), dict(board.key_counts), self.max_depth, self.max_time)
+        for jobs in self.jobs:
+            jobs.put(job)
+
+        best = super().run(board)
+        self.stop_event.set()
+        candidates = [(self.depth, self.score, best)]
+        self.helper_nodes = 0
+        for index, depth, score, nodes, code in self._collect():
+            self.helper_nodes += nodes
+            if code and best is not None:
+                candidates.append((depth, score, board.decode_move(code)))
+        self.nodes += self.helper_nodes
+        self.elapsed = time.perf_counter() - self.start
+
+        # the deepest finished iteration, the better score on a tie
+        self.depth, self.score, self.best_move = max(candidates, key=lambda c: (c[0], c[1]))
+        return self.best_move
+
+    def _collect(self):
+        # one result per helper; fails instead of waiting on a dead one
+        found = []
+        while len(found) < len(self.helpers):
+            try:
+                found.append(self.results.get(timeout=1.0))
+            except queue.Empty:
+                if not all(helper.is_alive() for helper in self.helpers):
+                    raise RuntimeError('a search helper process died')
+        return found
+
+    def close(self):
+        for jobs in self.jobs:
+            jobs.put(None)
+        for helper in self.helpers:
+            helper.join(timeout=5)
+            if helper.is_alive():
+                helper.terminate()
+        self.jobs, self.helpers = [], []
+        self.shared.close()
@@ -0,0 +1,214 @@
+"""
+Perft: counts the leaf nodes of the legal move tree to measure and
+verify move generation.
+
+    python src/perft.py                          # run the suite on both engines
+    python src/perft.py -p kiwipete -d 3 --divide
+    python src/perft.py --save perft_baseline.json
+    python src/perft.py --check perft_baseline.json
+
+The 'board' engine is Board.legal_moves with make_move/unmake_move,
+the 'position' engine is the bitboard core. Both generate every
+promotion, so both are compared with the published numbers.
+"""
+import argparse
+import json
+import sys
+import time
+
+from board import Board
+from position import Position, START_FEN, move_name
+from bitboard import square_index, square_name
+
+# name: (fen, {depth: published count}, suite depth)
+POSITIONS = {
+    'startpos': (START_FEN,
+                 {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}, 3),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                 {1: 48, 2: 2039, 3: 97862, 4: 4085603}, 2),
+    'position3': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+                  {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}, 4),
+    'position4': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+                  {1: 6, 2: 264, 3: 9467, 4: 422333}, 3),
+    'position5': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+                  {1: 44, 2: 1486, 3: 62379, 4: 2103487}, 2),
+    'ep-pin-rank': ('3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1',
+                    {1: 18, 2: 92, 3: 1670, 4: 10138, 6: 1134888}, 4),
+    'ep-pin-diagonal': ('8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1',
+                        {1: 13, 2: 102, 3: 1266, 4: 10276, 6: 1015133}, 4),
+    'ep-gives-check': ('8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1',
+                       {1: 15, 2: 126, 3: 1928, 4: 13931, 6: 1440467}, 4),
+    'short-castle-check': ('5k2/8/8/8/8/8/8/4K2R w K - 0 1',
+                           {1: 15, 2: 66, 3: 1198, 4: 6399, 6: 661072}, 4),
+    'long-castle-check': ('3k4/8/8/8/8/8/8/R3K3 w Q - 0 1',
+                          {1: 16, 2: 71, 3: 1286, 4: 7418, 6: 803711}, 4),
+    'castling-rights': ('r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1',
+                        {1: 26, 2: 1141, 3: 27826, 4: 1274206}, 2),
+    'castle-through-check': ('r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1',
+                             {1: 44, 2: 1494, 3: 50509, 4: 1720476}, 2),
+    'promote-out-of-check': ('2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1',
+                             {1: 11, 2: 133, 3: 1442, 4: 19174, 6: 3821001}, 3),
+    'discovered-check': ('8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1',
+                         {1: 29, 2: 165, 3: 5160, 4: 31961, 5: 1004658}, 3),
+    'promote-to-check': ('4k3/1P6/8/8/8/8/K7/8 w - - 0 1',
+                         {1: 9, 2: 40, 3: 472, 4: 2661, 6: 217342}, 4),
+    'underpromote-to-check': ('8/P1k5/K7/8/8/8/8/8 w - - 0 1',
+                              {1: 6, 2: 27, 3: 273, 4: 1329, 6: 92683}, 4),
+    'self-stalemate': ('K1k5/8/P7/8/8/8/8/8 w - - 0 1',
+                       {1: 2, 2: 6, 3: 13, 4: 63, 6: 2217}, 4),
+    'stalemate-and-mate': ('8/k1P5/8/1K6/8/8/8/8 w - - 0 1',
+                           {1: 10, 2: 25, 3: 268, 4: 926, 7: 567584}, 4),
+    'double-check': ('8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1',
+                     {1: 37, 2: 183, 3: 6559, 4: 23527}, 3),
+}
+
+ENGINES = ('board', 'position')
+
+
+# ==================== PERFT ====================
+def board_perft(board, depth):
+    moves = board.legal_moves(board.next_player)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for piece, move in moves:
+        undo = board.make_move(piece, move)
+        nodes += board_perft(board, depth - 1)
+        board.unmake_move(undo)
+    return nodes
+
+def position_perft(pos, depth):
+    moves = pos.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        pos.make(move)
+        nodes += position_perft(pos, depth - 1)
+        pos.unmake()
+    return nodes
+
+def board_divide(board, depth):
+    counts = {}
+    for piece, move in board.legal_moves(board.next_player):
+        name = square_name(square_index(move.initial.row, move.initial.col)) + \
+               square_name(square_index(move.final.row, move.final.col))
+        undo = board.make_move(piece, move)
+        counts[name] = board_perft(board, depth - 1) if depth > 1 else 1
+        board.unmake_move(undo)
+    return counts
+
+def position_divide(pos, depth):
+    counts = {}
+    for move in pos.legal_moves():
+        pos.make(move)
+        counts[move_name(move)] = position_perft(pos, depth - 1) if depth > 1 else 1
+        pos.unmake()
+    return counts
+
+def load(engine, fen):
+    pos = Position.from_fen(fen)
+    return pos if engine == 'position' else Board.from_position(pos)
+
+def run(engine, name, fen, depth, divide=False):
+    root = load(engine, fen)
+    start = time.perf_counter()
+    if divide:
+        counts = (position_divide if engine == 'position' else board_divide)(root, depth)
+        nodes = sum(counts.values())
+    else:
+        counts = None
+        nodes = (position_perft if engine == 'position' else board_perft)(root, depth)
+    seconds = time.perf_counter() - start
+    return {
+        'engine': engine,
+        'position': name,
+        'depth': depth,
+        'nodes': nodes,
+        'seconds': round(seconds, 4),
+        'nps': int(nodes / seconds) if seconds > 0 else 0,
+        'divide': counts,
+    }
+
+def expected_nodes(name, depth):
+    if name not in POSITIONS:
+        return None
+    return POSITIONS[name][1].get(depth)
+
+
+# ==================== BASELINE ====================
+def compare(results, baseline, tolerance):
+    # list of failure messages against a saved baseline
+    saved = {(r['engine'], r['position'], r['depth']): r for r in baseline['results']}
+    failures = []
+    for r in results:
+        old = saved.get((r['engine'], r['position'], r['depth']))
+        if old is None:
+            continue
+        if r['nodes'] != old['nodes']:
+            failures.append(f"{r['engine']} {r['position']} d{r['depth']}: "
+                            f"{r['nodes']} nodes, baseline {old['nodes']}")
+        elif r['nps'] < old['nps'] * (1 - tolerance):
+            failures.append(f"{r['engine']} {r['position']} d{r['depth']}: "
+                            f"{r['nps']} nps, baseline {old['nps']} (-{tolerance:.0%} allowed)")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Perft benchmark and move generation check.')
+    parser.add_argument('-e', '--engine', choices=ENGINES + ('both',), default='both')
+    parser.add_argument('-p', '--position', action='append', choices=sorted(POSITIONS),
+                        help='named position (repeatable, default: whole suite)')
+    parser.add_argument('--fen', help='custom position instead of the suite')
+    parser.add_argument('-d', '--depth', type=int, help='depth (default: per position suite depth)')
+    parser.add_argument('--divide', action='store_true', help='print counts per root move')
+    parser.add_argument('--save', metavar='FILE', help='write the results as a JSON baseline')
+    parser.add_argument('--check', metavar='FILE', help='compare against a JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed nodes/second drop against the baseline (default 0.25)')
+    args = parser.parse_args(argv)
+
+    engines = ENGINES if args.engine == 'both' else (args.engine,)
+    if args.fen:
+        jobs = [('fen', args.fen, args.depth or 3)]
+    else:
+        names = args.position or list(POSITIONS)
+        jobs = [(name, POSITIONS[name][0], args.depth or POSITIONS[name][2]) for name in names]
+
+    results, wrong = [], 0
+    for engine in engines:
+        for name, fen, depth in jobs:
+            r = run(engine, name, fen, depth, args.divide)
+            expected = expected_nodes(name, depth)
+            status = '' if expected is None else 'ok' if r['nodes'] == expected else f'FAIL (expected {expected})'
+            wrong += status.startswith('FAIL')
+            if r['divide']:
+                for move, count in sorted(r['divide'].items()):
+                    print(f'  {move}: {count}')
+            print(f"{engine:9} {name:22} d{depth}  {r['nodes']:>10} nodes  "
+                  f"{r['seconds']:8.3f} s  {r['nps']:>9} nps  {status}")
+            results.append(r)
+
+    total_nodes = sum(r['nodes'] for r in results)
+    total_seconds = sum(r['seconds'] for r in results)
+    if total_seconds > 0:
+        print(f'total: {total_nodes} nodes in {total_seconds:.3f} s, {int(total_nodes / total_seconds)} nps')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'results': [{k: v for k, v in r.items() if k != 'divide'} for r in results]},
+                      f, indent=2)
+        print(f'baseline saved to {args.save}')
+
+    failures = []
+    if args.check:
+        with open(args.check) as f:
+            failures = compare(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print('regression:', failure)
+
+    return 1 if wrong or failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
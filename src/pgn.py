@@ -0,0 +1,276 @@
+"""
+Portable Game Notation: SAN for Board moves, a writer and a streaming
+reader.
+
+read_games() takes any iterable of lines (an open file) and yields one
+(tags, sans, result) game at a time, so memory stays bounded by the
+longest game whatever the file size. replay() plays the SAN moves of a
+game on a Board for validation, statistics or position extraction;
+parse_san() resolves one move by looking only at the pieces that can
+reach its target square.
+"""
+import re
+
+from board import Board
+from move import Move
+from square import Square
+from piece import Pawn, Knight, Bishop, Rook, Queen, King
+from position import QUIET, DOUBLE_PUSH, CAPTURE, EN_PASSANT, PROMOTION, PROMOTION_CAPTURE, START_FEN
+from movetables import KNIGHT_TARGETS, KING_TARGETS, PAWN_CAPTURES, STRAIGHT_RAYS, DIAGONAL_RAYS
+
+PIECE_LETTERS = {'pawn': '', 'knight': 'N', 'bishop': 'B', 'rook': 'R', 'queen': 'Q', 'king': 'K'}
+PROMOTION_LETTERS = 'NBRQ'     # indexed by flag & 3
+STANDARD_TAGS = ('Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result')
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+# ==================== SAN ====================
+def square_name(row, col):
+    return 'abcdefgh'[col] + str(8 - row)
+
+def san(board, piece, move, legal_moves=None):
+    # standard algebraic notation of a legal move, before it is played
+    initial, final = move.initial, move.final
+    if piece.name == 'king' and abs(final.col - initial.col) == 2:
+        text = 'O-O' if final.col > initial.col else 'O-O-O'
+    else:
+        capture = board.squares[final.row][final.col].has_piece() or \
+                  (piece.name == 'pawn' and final.col != initial.col)
+        target = square_name(final.row, final.col)
+        if piece.name == 'pawn':
+            text = ('abcdefgh'[initial.col] + 'x' if capture else '') + target
+            if final.row == 0 or final.row == 7:
+                text += '=' + PROMOTION_LETTERS[move.flag & 3 if move.flag & PROMOTION else 3]
+        else:
+            text = PIECE_LETTERS[piece.name] + _disambiguation(board, piece, move, legal_moves) + \
+                   ('x' if capture else '') + target
+
+    undo = board.make_move(piece, move)
+    if board.is_in_check(board.next_player):
+        text += '#' if not board.legal_moves(board.next_player) else '+'
+    board.unmake_move(undo)
+    return text
+
+def _disambiguation(board, piece, move, legal_moves):
+    if legal_moves is None:
+        legal_moves = board.legal_moves(piece.color)
+    initial, final = move.initial, move.final
+    rivals = [m.initial for p, m in legal_moves
+              if p is not piece and p.name == piece.name and p.color == piece.color
+              and m.final.row == final.row and m.final.col == final.col]
+    if not rivals:
+        return ''
+    if all(sq.col != initial.col for sq in rivals):
+        return 'abcdefgh'[initial.col]
+    if all(sq.row != initial.row for sq in rivals):
+        return str(8 - initial.row)
+    return square_name(initial.row, initial.col)
+
+
+# ==================== WRITER ====================
+def format_game(tags, sans, result='*', start_fullmove=1, start_color='white'):
+    # PGN text of one game; tags is a dict, sans the moves in SAN
+    tags = dict(tags)
+    tags['Result'] = result
+    lines = [f'[{name} "{tags.get(name, "?")}"]' for name in STANDARD_TAGS]
+    lines += [f'[{name} "{value}"]' for name, value in tags.items() if name not in STANDARD_TAGS]
+
+    tokens = []
+    number, color = start_fullmove, start_color
+    for i, text in enumerate(sans):
+        if color == 'white':
+            tokens.append(f'{number}. {text}')
+        elif i == 0:
+            tokens.append(f'{number}... {text}')
+        else:
+            tokens.append(text)
+        if color == 'black':
+            number += 1
+        color = 'black' if color == 'white' else 'white'
+    tokens.append(result)
+
+    movetext, line = [], ''
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 79:
+            movetext.append(line)
+            line = token
+        else:
+            line = f'{line} {token}' if line else token
+    movetext.append(line)
+    return '\n'.join(lines) + '\n\n' + '\n'.join(movetext) + '\n'
+
+
+# ==================== READER ====================
+TAG_RE = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+COMMENT_RE = re.compile(r'\{[^}]*\}|;[^\n]*')
+VARIATION_RE = re.compile(r'\([^()]*\)')
+# SAN tokens start with a letter, except castling written with zeros;
+# move numbers, NAGs and results (1-0, 0-1) do not match
+SAN_TOKEN_RE = re.compile(r'[A-Za-z][A-Za-z0-9+#=!?-]*|(?<![\w-])0-0(?:-0)?(?![\w-])[+#!?]*')
+RESULT_RE = re.compile(r'(1-0|0-1|1/2-1/2|\*)\s*$')
+
+def read_games(lines):
+    # (tags, sans, result) for each game in an iterable of lines
+    tags, movetext, in_comment = {}, [], False
+    for line in lines:
+        if line[:1] == '[' and not in_comment:
+            if movetext:
+                yield _game(tags, movetext)
+                tags, movetext = {}, []
+            match = TAG_RE.match(line)
+            if match:
+                tags[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+        elif line[:1] == '%':
+            continue    # escape line
+        elif line.strip():
+            movetext.append(line)
+            if '{' in line or '}' in line:
+                in_comment = line.rfind('{') > line.rfind('}')
+    if tags or movetext:
+        yield _game(tags, movetext)
+
+def _game(tags, movetext):
+    # lines may or may not keep their '\n'; ';' comments end at one
+    text = '\n'.join(movetext)
+    if '{' in text or ';' in text:
+        text = COMMENT_RE.sub(' ', text)
+    while '(' in text:
+        text, count = VARIATION_RE.subn(' ', text)
+        if not count:
+            break
+    match = RESULT_RE.search(text)
+    result = match.group(1) if match else tags.get('Result', '*')
+    return tags, SAN_TOKEN_RE.findall(text), result
+
+def start_board(tags):
+    # the game's initial position, from the SetUp/FEN tags if present
+    fen = tags.get('FEN')
+    return Board.from_fen(fen) if fen else Board()
+
+def replay(sans, board=None):
+    # plays the moves on board (the initial position by default) and
+    # yields (piece, move) after each; ValueError on a bad move
+    if board is None:
+        board = Board()
+    for text in sans:
+        candidates = san_candidates(board, text)
+        if len(candidates) == 1:
+            # the usual case: play the move and look for check afterwards,
+            # cheaper than working out the pins for a single move
+            piece, move = candidates[0]
+            undo = board.make_move(piece, move)
+            if board.is_in_check(piece.color):
+                board.unmake_move(undo)
+                raise ValueError(f'illegal move {text!r} for {piece.color} in {board.to_fen()}')
+            piece.clear_moves()
+        else:
+            piece, move = parse_san(board, text)
+            board.move(piece, move, testing=True)
+        yield piece, move
+
+
+# ==================== SAN PARSER ====================
+SAN_RE = re.compile(r'([NBRQK])?([a-h])?([1-8])?x?([a-h])([1-8])(?:=?([NBRQ]))?')
+PIECE_KINDS = {None: Pawn, 'N': Knight, 'B': Bishop, 'R': Rook, 'Q': Queen, 'K': King}
+
+def parse_san(board, text):
+    # (piece, Move) for a SAN move of the side to move
+    found = [(piece, move) for piece, move in san_candidates(board, text)
+             if board.is_legal(piece, move)]
+    if len(found) > 1:
+        raise ValueError(f'ambiguous move {text!r}')
+    if not found:
+        raise ValueError(f'illegal move {text!r} for {board.next_player} in {board.to_fen()}')
+    return found[0]
+
+def san_candidates(board, text):
+    # pseudo-legal (piece, Move) pairs matching a SAN move; only the
+    # pieces that can reach the target square are looked at
+    color = board.next_player
+    san_text = text.rstrip('+#!?')
+    if san_text in ('O-O', 'O-O-O', '0-0', '0-0-0'):
+        return _castling_candidates(board, color, len(san_text) > 3)
+
+    match = SAN_RE.fullmatch(san_text)
+    if match is None:
+        raise ValueError(f'unreadable SAN move {text!r}')
+    letter, from_file, from_rank, file, rank, promotion = match.groups()
+    row, col = 8 - int(rank), ord(file) - 97
+    from_col = ord(from_file) - 97 if from_file else None
+    from_row = 8 - int(from_rank) if from_rank else None
+    kind = PIECE_KINDS[letter]
+
+    squares = board.squares
+    target = squares[row][col].piece
+    if target is not None and target.color == color:
+        return []
+    index = row * 8 + col
+
+    if kind is Pawn:
+        origins = _pawn_origins(board, color, row, col, from_col, target is not None)
+    elif kind is Knight or kind is King:
+        table = KNIGHT_TARGETS if kind is Knight else KING_TARGETS
+        origins = [(r, c) for r, c in table[index]
+                   if isinstance(squares[r][c].piece, kind) and squares[r][c].piece.color == color]
+    else:
+        rays = STRAIGHT_RAYS[index] if kind is Rook else DIAGONAL_RAYS[index] if kind is Bishop \
+            else STRAIGHT_RAYS[index] + DIAGONAL_RAYS[index]
+        origins = []
+        for ray in rays:
+            for r, c in ray:
+                p = squares[r][c].piece
+                if p is not None:
+                    if isinstance(p, kind) and p.color == color:
+                        origins.append((r, c))
+                    break
+
+    final = Square.at(row, col)
+    candidates = []
+    for r, c in origins:
+        if (from_col is not None and c != from_col) or (from_row is not None and r != from_row):
+            continue
+        piece = squares[r][c].piece
+        candidates.append((piece, Move(Square.at(r, c), final, _flag(board, piece, r, row, col, target, promotion))))
+    return candidates
+
+def _pawn_origins(board, color, row, col, from_col, capture):
+    squares = board.squares
+    enemy = 'black' if color == 'white' else 'white'
+    if from_col is not None and from_col != col:
+        # captures come from where an enemy pawn on the target would capture
+        origins = [(r, c) for r, c in PAWN_CAPTURES[enemy][row * 8 + col] if c == from_col]
+        if not capture:
+            ep = board.en_passant_square
+            if ep is None or ep.col != col or ep.row != row - (-1 if color == 'white' else 1):
+                return []
+    else:
+        if capture:
+            return []
+        back = 1 if color == 'white' else -1
+        origins = [(row + back, col)] if 0 <= row + back < 8 else []
+        if origins and squares[row + back][col].isempty() and row == (4 if color == 'white' else 3):
+            origins = [(row + 2 * back, col)]
+    return [(r, c) for r, c in origins
+            if isinstance(squares[r][c].piece, Pawn) and squares[r][c].piece.color == color]
+
+def _flag(board, piece, from_row, row, col, target, promotion):
+    if isinstance(piece, Pawn):
+        if row == 0 or row == 7:
+            promoted = PROMOTION_LETTERS.index(promotion) if promotion else 3
+            return (PROMOTION_CAPTURE if target is not None else PROMOTION) | promoted
+        if abs(row - from_row) == 2:
+            return DOUBLE_PUSH
+        if target is None and board.squares[from_row][col].piece is not None \
+                and board.squares[from_row][col] is board.en_passant_square:
+            return EN_PASSANT
+    return CAPTURE if target is not None else QUIET
+
+def _castling_candidates(board, color, long):
+    # castling is checked in full by the king's legal moves
+    king_square = board.kings.get(color)
+    if king_square is None:
+        return []
+    king = king_square.piece
+    board.calc_moves(king, king_square.row, king_square.col)
+    col = king_square.col + (-2 if long else 2)
+    return [(king, move) for move in king.moves if move.final.col == col and move.final.row == king_square.row]
@@ -1,7 +1,7 @@
-import os
-
 class Piece:
 
+    __slots__ = ('name', 'color', 'value', 'moves', 'moved', 'texture', 'texture_rect')
+
     def __init__(self, name, color, value, texture=None, texture_rect=None):
         self.name = name
         self.color = color
@@ -9,14 +9,10 @@ class Piece:
         self.value = value * value_sign
         self.moves = []
         self.moved = False
+        # images come from AssetCache; texture_rect is where the last one was drawn
         self.texture = texture
-        self.set_texture()
         self.texture_rect = texture_rect
 
-    def set_texture(self, size=80):
-        self.texture = os.path.join(
-            f'assets/images/imgs-{size}px/{self.color}_{self.name}.png')
-
     def add_move(self, move):
         self.moves.append(move)
 
@@ -25,6 +21,8 @@ class Piece:
 
 class Pawn(Piece):
 
+    __slots__ = ('dir', 'en_passant')
+
     def __init__(self, color):
         self.dir = -1 if color == 'white' else 1
         self.en_passant = False
@@ -32,26 +30,36 @@ class Pawn(Piece):
 
 class Knight(Piece):
 
+    __slots__ = ()
+
     def __init__(self, color):
         super().__init__('knight', color, 3.0)
 
 class Bishop(Piece):
 
+    __slots__ = ()
+
     def __init__(self, color):
         super().__init__('bishop', color, 3.001)
 
 class Rook(Piece):
 
+    __slots__ = ()
+
     def __init__(self, color):
         super().__init__('rook', color, 5.0)
 
 class Queen(Piece):
 
+    __slots__ = ()
+
     def __init__(self, color):
         super().__init__('queen', color, 9.0)
 
 class King(Piece):
 
+    __slots__ = ('left_rook', 'right_rook')
+
     def __init__(self, color):
         self.left_rook = None
         self.right_rook = None
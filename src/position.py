@@ -0,0 +1,338 @@
+from bitboard import *
+
+#Moves are 16 bit integers: from (6 bits) | to << 6 | flag << 12
+QUIET, DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE = 0, 1, 2, 3
+CAPTURE, EN_PASSANT = 4, 5
+PROMOTION = 8   # flag & 3 is the promotion piece (knight, bishop, rook, queen)
+PROMOTION_CAPTURE = 12
+
+#Castling rights bits
+WHITE_OO, WHITE_OOO, BLACK_OO, BLACK_OOO = 1, 2, 4, 8
+
+# rights kept when a piece leaves or lands on a square
+CASTLE_MASK = [15] * 64
+CASTLE_MASK[0] = 15 ^ WHITE_OOO
+CASTLE_MASK[7] = 15 ^ WHITE_OO
+CASTLE_MASK[4] = 15 ^ (WHITE_OO | WHITE_OOO)
+CASTLE_MASK[56] = 15 ^ BLACK_OOO
+CASTLE_MASK[63] = 15 ^ BLACK_OO
+CASTLE_MASK[60] = 15 ^ (BLACK_OO | BLACK_OOO)
+
+FEN_PIECES = {ch: i for i, ch in enumerate('PNBRQKpnbrqk')}
+FEN_CASTLING = {'K': WHITE_OO, 'Q': WHITE_OOO, 'k': BLACK_OO, 'q': BLACK_OOO}
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# decoded FEN ranks: text -> (8 mailbox entries, [(piece, file bits)]);
+# games keep reusing the same few hundred rank strings
+FEN_RANKS = {}
+FEN_RANKS_MAX = 1 << 16
+
+def _fen_rank(text):
+    mailbox, bits, file = [None] * 8, {}, 0
+    for ch in text:
+        if ch in '12345678':
+            file += int(ch)
+        elif ch not in FEN_PIECES:
+            raise ValueError(f'FEN rank {text!r}: unknown piece {ch!r}')
+        elif file >= 8:
+            raise ValueError(f'FEN rank {text!r} has more than 8 squares')
+        else:
+            piece = FEN_PIECES[ch]
+            mailbox[file] = piece
+            bits[piece] = bits.get(piece, 0) | 1 << file
+            file += 1
+    if file != 8:
+        raise ValueError(f'FEN rank {text!r} does not have 8 squares')
+    if len(FEN_RANKS) >= FEN_RANKS_MAX:
+        FEN_RANKS.clear()
+    decoded = FEN_RANKS[text] = (mailbox, list(bits.items()))
+    return decoded
+
+def fen_rank(text):
+    # (8 mailbox entries, [(piece, file bits)]) of one FEN rank; ValueError if malformed
+    return FEN_RANKS.get(text) or _fen_rank(text)
+
+
+def encode_move(initial, final, flag=QUIET):
+    return initial | (final << 6) | (flag << 12)
+
+def move_from(move):
+    return move & 63
+
+def move_to(move):
+    return (move >> 6) & 63
+
+def move_flag(move):
+    return move >> 12
+
+def is_capture(move):
+    return (move >> 12) & CAPTURE != 0
+
+def promotion_type(move):
+    # piece type promoted to, or None
+    flag = move >> 12
+    return KNIGHT + (flag & 3) if flag & PROMOTION else None
+
+def move_name(move):
+    name = square_name(move & 63) + square_name((move >> 6) & 63)
+    ptype = promotion_type(move)
+    return name + 'nbrq'[ptype - KNIGHT] if ptype is not None else name
+
+
+class Position:
+    """
+    Compact position core: twelve piece bitboards plus side to move,
+    castling rights, en passant square and clocks.
+    """
+
+    def __init__(self):
+        self.bb = [0] * 12
+        self.occ = [0, 0]
+        self.mailbox = [None] * 64
+        self.side = WHITE
+        self.castling = 0
+        self.ep = None
+        self.halfmove = 0
+        self.fullmove = 1
+        self.history = []
+
+    @classmethod
+    def initial(cls):
+        pos = cls()
+        back = (ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK)
+        for file in range(8):
+            pos.put(piece_index(WHITE, back[file]), file)
+            pos.put(piece_index(WHITE, PAWN), 8 + file)
+            pos.put(piece_index(BLACK, PAWN), 48 + file)
+            pos.put(piece_index(BLACK, back[file]), 56 + file)
+        pos.castling = WHITE_OO | WHITE_OOO | BLACK_OO | BLACK_OOO
+        return pos
+
+    @classmethod
+    def from_fen(cls, fen):
+        fields = fen.split()
+        pos = cls()
+        ranks = fields[0].split('/') if fields else ()
+        if len(ranks) != 8:
+            raise ValueError(f'FEN placement {fen!r} does not have 8 ranks')
+        bb, mailbox = pos.bb, pos.mailbox
+        for rank, text in zip(range(7, -1, -1), ranks):
+            decoded = fen_rank(text)
+            shift = rank * 8
+            mailbox[shift:shift + 8] = decoded[0]
+            for piece, bits in decoded[1]:
+                bb[piece] |= bits << shift
+        pos.occ = [bb[0] | bb[1] | bb[2] | bb[3] | bb[4] | bb[5],
+                   bb[6] | bb[7] | bb[8] | bb[9] | bb[10] | bb[11]]
+
+        pos.side = WHITE if len(fields) < 2 or fields[1] == 'w' else BLACK
+        if len(fields) > 2:
+            for ch in fields[2]:
+                pos.castling |= FEN_CASTLING.get(ch, 0)
+        if len(fields) > 3 and fields[3] != '-':
+            pos.ep = (int(fields[3][1]) - 1) * 8 + ord(fields[3][0]) - ord('a')
+        if len(fields) > 5:
+            pos.halfmove, pos.fullmove = int(fields[4]), int(fields[5])
+        return pos
+
+    def to_fen(self):
+        rows = []
+        for rank in range(7, -1, -1):
+            row, empty = '', 0
+            for file in range(8):
+                piece = self.mailbox[rank * 8 + file]
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += 'PNBRQKpnbrqk'[piece]
+            rows.append(row + (str(empty) if empty else ''))
+
+        castling = ''.join(ch for ch, bit in FEN_CASTLING.items() if self.castling & bit) or '-'
+        ep = square_name(self.ep) if self.ep is not None else '-'
+        side = 'w' if self.side == WHITE else 'b'
+        return f"{'/'.join(rows)} {side} {castling} {ep} {self.halfmove} {self.fullmove}"
+
+    # ==================== PIECES ====================
+    def put(self, piece, sq):
+        self.bb[piece] |= BIT[sq]
+        self.occ[piece // 6] |= BIT[sq]
+        self.mailbox[sq] = piece
+
+    def remove(self, sq):
+        piece = self.mailbox[sq]
+        self.bb[piece] ^= BIT[sq]
+        self.occ[piece // 6] ^= BIT[sq]
+        self.mailbox[sq] = None
+        return piece
+
+    def king_square(self, color):
+        return lsb(self.bb[color * 6 + KING])
+
+    # ==================== ATTACKS ====================
+    def is_attacked(self, sq, by_color):
+        bb = self.bb
+        base = by_color * 6
+        if PAWN_ATTACKS[by_color ^ 1][sq] & bb[base + PAWN]:
+            return True
+        if KNIGHT_ATTACKS[sq] & bb[base + KNIGHT]:
+            return True
+        if KING_ATTACKS[sq] & bb[base + KING]:
+            return True
+        occ = self.occ[0] | self.occ[1]
+        queens = bb[base + QUEEN]
+        diagonal = bb[base + BISHOP] | queens
+        if diagonal and bishop_attacks(sq, occ) & diagonal:
+            return True
+        straight = bb[base + ROOK] | queens
+        if straight and rook_attacks(sq, occ) & straight:
+            return True
+        return False
+
+    def in_check(self, color=None):
+        color = self.side if color is None else color
+        king = self.bb[color * 6 + KING]
+        return bool(king) and self.is_attacked(lsb(king), color ^ 1)
+
+    # ==================== MOVE GENERATION ====================
+    def pseudo_moves(self):
+        moves = []
+        us, them = self.side, self.side ^ 1
+        bb = self.bb
+        base = us * 6
+        own, enemy = self.occ[us], self.occ[them]
+        occ = own | enemy
+        empty = ~occ & FULL
+
+        # pawns
+        pawns = bb[base + PAWN]
+        if us == WHITE:
+            single = (pawns << 8) & empty
+            double = ((single & (RANK_1 << 16)) << 8) & empty
+            up, last_rank = 8, RANK_8
+        else:
+            single = (pawns >> 8) & empty
+            double = ((single & (RANK_1 << 40)) >> 8) & empty
+            up, last_rank = -8, RANK_1
+        for to in squares_of(single & ~last_rank):
+            moves.append(encode_move(to - up, to))
+        for to in squares_of(single & last_rank):
+            for promo in (3, 2, 1, 0):
+                moves.append(encode_move(to - up, to, PROMOTION | promo))
+        for to in squares_of(double):
+            moves.append(encode_move(to - 2 * up, to, DOUBLE_PUSH))
+        for sq in squares_of(pawns):
+            attacks = PAWN_ATTACKS[us][sq]
+            for to in squares_of(attacks & enemy):
+                if BIT[to] & last_rank:
+                    for promo in (3, 2, 1, 0):
+                        moves.append(encode_move(sq, to, PROMOTION_CAPTURE | promo))
+                else:
+                    moves.append(encode_move(sq, to, CAPTURE))
+            if self.ep is not None and attacks & BIT[self.ep]:
+                moves.append(encode_move(sq, self.ep, EN_PASSANT))
+
+        # pieces
+        targets = ~own & FULL
+        for ptype in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            for sq in squares_of(bb[base + ptype]):
+                if ptype == KNIGHT:
+                    attacks = KNIGHT_ATTACKS[sq]
+                elif ptype == BISHOP:
+                    attacks = bishop_attacks(sq, occ)
+                elif ptype == ROOK:
+                    attacks = rook_attacks(sq, occ)
+                elif ptype == QUEEN:
+                    attacks = queen_attacks(sq, occ)
+                else:
+                    attacks = KING_ATTACKS[sq]
+                attacks &= targets
+                for to in squares_of(attacks & enemy):
+                    moves.append(encode_move(sq, to, CAPTURE))
+                for to in squares_of(attacks & ~enemy):
+                    moves.append(encode_move(sq, to))
+
+        # castling (never out of or through an attacked square)
+        if us == WHITE:
+            if self.castling & WHITE_OO and not occ & 0x60 and \
+               not self.is_attacked(4, them) and not self.is_attacked(5, them):
+                moves.append(encode_move(4, 6, KING_CASTLE))
+            if self.castling & WHITE_OOO and not occ & 0x0E and \
+               not self.is_attacked(4, them) and not self.is_attacked(3, them):
+                moves.append(encode_move(4, 2, QUEEN_CASTLE))
+        else:
+            if self.castling & BLACK_OO and not occ & (0x60 << 56) and \
+               not self.is_attacked(60, them) and not self.is_attacked(61, them):
+                moves.append(encode_move(60, 62, KING_CASTLE))
+            if self.castling & BLACK_OOO and not occ & (0x0E << 56) and \
+               not self.is_attacked(60, them) and not self.is_attacked(59, them):
+                moves.append(encode_move(60, 58, QUEEN_CASTLE))
+        return moves
+
+    def legal_moves(self):
+        moves = []
+        us = self.side
+        for move in self.pseudo_moves():
+            self.make(move)
+            if not self.is_attacked(lsb(self.bb[us * 6 + KING]), us ^ 1):
+                moves.append(move)
+            self.unmake()
+        return moves
+
+    # ==================== MAKE / UNMAKE ====================
+    def make(self, move):
+        initial, final, flag = move & 63, (move >> 6) & 63, move >> 12
+        us = self.side
+        captured = None
+
+        if flag == EN_PASSANT:
+            captured = self.remove(final - 8 if us == WHITE else final + 8)
+        elif flag & CAPTURE:
+            captured = self.remove(final)
+        self.history.append((move, captured, self.castling, self.ep, self.halfmove))
+
+        piece = self.remove(initial)
+        if flag & PROMOTION:
+            self.put(piece_index(us, KNIGHT + (flag & 3)), final)
+        else:
+            self.put(piece, final)
+
+        if flag == KING_CASTLE:
+            self.put(self.remove(final + 1), final - 1)
+        elif flag == QUEEN_CASTLE:
+            self.put(self.remove(final - 2), final + 1)
+
+        self.castling &= CASTLE_MASK[initial] & CASTLE_MASK[final]
+        self.ep = (initial + final) >> 1 if flag == DOUBLE_PUSH else None
+        if piece % 6 == PAWN or captured is not None:
+            self.halfmove = 0
+        else:
+            self.halfmove += 1
+        if us == BLACK:
+            self.fullmove += 1
+        self.side = us ^ 1
+
+    def unmake(self):
+        move, captured, self.castling, self.ep, self.halfmove = self.history.pop()
+        initial, final, flag = move & 63, (move >> 6) & 63, move >> 12
+        self.side ^= 1
+        us = self.side
+        if us == BLACK:
+            self.fullmove -= 1
+
+        if flag == KING_CASTLE:
+            self.put(self.remove(final - 1), final + 1)
+        elif flag == QUEEN_CASTLE:
+            self.put(self.remove(final + 1), final - 2)
+
+        piece = self.remove(final)
+        if flag & PROMOTION:
+            piece = piece_index(us, PAWN)
+        self.put(piece, initial)
+
+        if flag == EN_PASSANT:
+            self.put(captured, final - 8 if us == WHITE else final + 8)
+        elif captured is not None:
+            self.put(captured, final)
@@ -0,0 +1,159 @@
+import pygame
+
+from const import *
+
+PIECE_SIZE = 80      # board textures are slightly larger than a square
+HOVER_COLOR = (180, 180, 180)
+
+
+class Renderer:
+    """
+    Redraws only the parts of the screen that changed since the last
+    frame. Every frame the visible state (pieces, last move, hover,
+    legal move highlights and the dragged piece) is compared with the
+    previous one; each change becomes a dirty rectangle that is
+    repainted from a cached background and passed to
+    pygame.display.update.
+    """
+
+    def __init__(self, game, overlay=None):
+        self.game = game
+        self.overlay = overlay      # drawn on top of full redraws when the game is over
+        self.backgrounds = {}
+        self.state = None
+        self.frames = 0
+        self.full_redraws = 0
+        self.dirty_rects = 0
+
+    def invalidate(self):
+        # force a full redraw on the next frame
+        self.state = None
+
+    # ==================== BACKGROUND ====================
+    def background(self):
+        # squares and coordinates, cached per theme
+        game = self.game
+        key = (game.bg_light_color, game.bg_dark_color)
+        surface = self.backgrounds.get(key)
+        if surface is None:
+            surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+            game.show_bg(surface)
+            self.backgrounds[key] = surface
+        return surface
+
+    # ==================== STATE ====================
+    def snapshot(self):
+        game = self.game
+        dragger = game.dragger
+        dragged = dragger.piece if dragger.dragging else None
+        pieces = tuple(sq.piece if sq.piece is not dragged else None
+                       for row in game.board.squares for sq in row)
+        last = game.last_move
+        last = ((last.initial.row, last.initial.col), (last.final.row, last.final.col)) if last else ()
+        hover = (game.hovered_sq.row, game.hovered_sq.col) if game.hovered_sq else None
+        moves = frozenset((m.final.row, m.final.col) for m in dragged.moves) if dragged else frozenset()
+        drag = self.drag_rect(dragged) if dragged else None
+        theme = (game.bg_light_color, game.bg_dark_color)
+        return game.board, theme, game.game_over, pieces, last, hover, moves, drag
+
+    def drag_rect(self, piece):
+        dragger = self.game.dragger
+        img = self.game.assets.texture(piece.color, piece.name, 128)
+        return img.get_rect(center=(dragger.mouseX, dragger.mouseY))
+
+    def changes(self, old, new):
+        # dirty rectangles between two snapshots, or None for a full redraw
+        if old is None or old[:3] != new[:3]:
+            return None
+        _, _, _, pieces, last, hover, moves, drag = new
+        _, _, _, old_pieces, old_last, old_hover, old_moves, old_drag = old
+
+        rects = []
+        for index, piece in enumerate(pieces):
+            if piece is not old_pieces[index]:
+                rects.append(piece_rect(*divmod(index, COLS)))
+        if last != old_last:
+            rects += [square_rect(*sq) for sq in set(last) ^ set(old_last)]
+        if hover != old_hover:
+            rects += [square_rect(*sq) for sq in (hover, old_hover) if sq is not None]
+        rects += [square_rect(*sq) for sq in moves ^ old_moves]
+        if drag != old_drag:
+            rects += [r for r in (drag, old_drag) if r is not None]
+        if rects and new[2]:
+            return None     # keep the game over message on top
+        return rects
+
+    # ==================== DRAWING ====================
+    def draw(self, surface):
+        # repaints what changed and returns the updated rectangles
+        state = self.snapshot()
+        rects = self.changes(self.state, state)
+        self.state = state
+        self.frames += 1
+
+        if rects is None:
+            full = surface.get_rect()
+            self.repaint(surface, full)
+            if state[2] and self.overlay:
+                self.overlay(surface)
+            self.full_redraws += 1
+            pygame.display.update()
+            return [full]
+
+        bounds = surface.get_rect()
+        rects = [r.clip(bounds) for r in rects]
+        rects = [r for r in rects if r.width and r.height]
+        for rect in rects:
+            self.repaint(surface, rect)
+        if rects:
+            self.dirty_rects += len(rects)
+            pygame.display.update(rects)
+        return rects
+
+    def repaint(self, surface, rect):
+        # draws every layer that touches rect, clipped to it
+        game = self.game
+        _, _, _, pieces, last, hover, moves, drag = self.state
+        surface.set_clip(rect)
+        surface.blit(self.background(), rect, rect)
+
+        # squares whose pieces may overflow into rect
+        margin = (PIECE_SIZE - SQSIZE + 1) // 2
+        first_row, last_row = max(0, (rect.top - margin) // SQSIZE), min(ROWS - 1, (rect.bottom + margin - 1) // SQSIZE)
+        first_col, last_col = max(0, (rect.left - margin) // SQSIZE), min(COLS - 1, (rect.right + margin - 1) // SQSIZE)
+        squares = [(row, col) for row in range(first_row, last_row + 1) for col in range(first_col, last_col + 1)]
+
+        for row, col in squares:
+            if (row, col) in last:
+                color = game.trace_light_color if (row + col) % 2 == 0 else game.trace_dark_color
+                outline(surface, color, square_rect(row, col), 4)
+        for row, col in squares:
+            if (row, col) in moves:
+                color = game.move_light_color if (row + col) % 2 == 0 else game.move_dark_color
+                pygame.draw.rect(surface, color, square_rect(row, col))
+        for row, col in squares:
+            piece = pieces[row * COLS + col]
+            if piece is not None:
+                img = game.assets.texture(piece.color, piece.name, PIECE_SIZE)
+                piece.texture_rect = img.get_rect(center=square_rect(row, col).center)
+                surface.blit(img, piece.texture_rect)
+        if hover in squares:
+            outline(surface, HOVER_COLOR, square_rect(*hover), 3)
+        if drag is not None and drag.colliderect(rect):
+            game.dragger.update_blit(surface)
+        surface.set_clip(None)
+
+
+def square_rect(row, col):
+    return pygame.Rect(col * SQSIZE, row * SQSIZE, SQSIZE, SQSIZE)
+
+def outline(surface, color, rect, width):
+    # draw.rect(width=...) leaks lines along the clip edge, filled edges clip exactly
+    x, y, w, h = rect
+    for edge in ((x, y, w, width), (x, y + h - width, w, width), (x, y, width, h), (x + w - width, y, width, h)):
+        surface.fill(color, edge)
+
+def piece_rect(row, col):
+    rect = pygame.Rect(0, 0, PIECE_SIZE, PIECE_SIZE)
+    rect.center = square_rect(row, col).center
+    return rect
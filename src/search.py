@@ -0,0 +1,288 @@
+import time
+
+from evaluation import evaluate
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from tablebase import MAX_PIECES
+
+MATE = 100000.0
+INFINITY = float('inf')
+MAX_PLY = 128
+# scores above this are mates; tablebase mates can be up to 254 plies
+# away on top of the search ply
+MATE_BOUND = MATE - 512
+
+# how often (in nodes) the limits are checked
+CHECK_EVERY = 256
+
+
+class Search:
+    """
+    Iterative deepening negamax with alpha-beta pruning and a capture
+    quiescence search. Moves are ordered by MVV-LVA, killers and the
+    history heuristic. The search stops at the first limit reached:
+    depth, nodes or wall-clock seconds. With tablebases (see
+    tablebase.py), positions they cover score exactly and a covered
+    root is answered without searching.
+    """
+
+    def __init__(self, max_depth=64, max_nodes=None, max_time=None, info=None, hash_mb=16,
+                 tablebases=None, tt=None):
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self.info = info
+        self.tablebases = tablebases
+        self.tt = tt if tt is not None else TranspositionTable(hash_mb)
+        self.start_depth = 1        # first iteration (ParallelSearch staggers its helpers)
+        self.abort = False
+        self.reset()
+
+    def reset(self):
+        self.nodes = 0
+        self.depth = 0
+        self.score = 0.0
+        self.elapsed = 0.0
+        self.best_move = None
+        self.stopped = False
+        self.countdown = CHECK_EVERY    # nodes until the next limit check
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {}
+
+    def nps(self):
+        return int(self.nodes / self.elapsed) if self.elapsed > 0 else 0
+
+    def stop(self):
+        # safe from another thread: the running search unwinds at its
+        # next node; run() clears the flag when it starts
+        self.abort = True
+
+    def close(self):
+        # nothing to release here; ParallelSearch stops its processes
+        pass
+
+    def principal_variation(self, board, length=8):
+        # best line from the transposition table, as (piece, move) pairs
+        pv, undos, seen = [], [], set()
+        while len(pv) < length:
+            key = board.key()
+            entry = self.tt.probe(key)
+            if entry is None or not entry[3] or key in seen:
+                break
+            seen.add(key)
+            piece, move = board.decode_move(entry[3])
+            if piece is None or piece.color != board.next_player or \
+               not any(p is piece and m == move for p, m in board.legal_moves(board.next_player)):
+                break
+            pv.append((piece, move))
+            undos.append(board.make_move(piece, move))
+        for undo in reversed(undos):
+            board.unmake_move(undo)
+        return pv
+
+    # ==================== ITERATIVE DEEPENING ====================
+    def run(self, board):
+        # returns the best (piece, move) for the side to move, or None
+        self.abort = False
+        self.reset()
+        self.tt.new_search()
+        self.start = time.perf_counter()
+
+        moves = board.legal_moves(board.next_player)
+        if not moves:
+            return None
+        self.best_move = moves[0]
+
+        if self.tablebases is not None:
+            found = self._tablebase_root(board, moves)
+            if found is not None:
+                self.score, self.best_move = found
+                self.elapsed = time.perf_counter() - self.start
+                if self.info:
+                    self.info(self)
+                return self.best_move
+
+        for depth in range(self.start_depth, self.max_depth + 1):
+            score, best = self._root(board, moves, depth)
+            if self.stopped:
+                break
+            self.depth, self.score, self.best_move = depth, score, best
+            self.elapsed = time.perf_counter() - self.start
+            if self.info:
+                self.info(self)
+            if abs(score) >= MATE_BOUND or len(moves) == 1:
+                break
+
+        self.elapsed = time.perf_counter() - self.start
+        return self.best_move
+
+    def _root(self, board, moves, depth):
+        # search the previous best move first
+        moves.remove(self.best_move)
+        moves.insert(0, self.best_move)
+
+        alpha, best = -INFINITY, moves[0]
+        for piece, move in moves:
+            undo = board.make_move(piece, move)
+            score = -self._negamax(board, depth - 1, -INFINITY, -alpha, 1)
+            board.unmake_move(undo)
+            if self.stopped:
+                break
+            if score > alpha:
+                alpha, best = score, (piece, move)
+        if not self.stopped:
+            self.tt.store(board.key(), depth, alpha, EXACT, best[1].encode())
+        return alpha, best
+
+    # ==================== NEGAMAX ====================
+    def _negamax(self, board, depth, alpha, beta, ply):
+        if self._limits_hit():
+            return 0.0
+        if board.halfmove >= 100 or board.repetitions() >= 2:
+            # a repetition inside the search is scored as the draw it can force
+            return 0.0
+        if self.tablebases is not None and board.piece_count <= MAX_PIECES:
+            score = self._tablebase_score(board, ply)
+            if score is not None:
+                self.nodes += 1
+                return score
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(board, alpha, beta, ply)
+        self.nodes += 1
+
+        key = board.key()
+        tt_move = 0
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                tt_score = score_from_tt(tt_score, ply)
+                if tt_flag == EXACT or \
+                   (tt_flag == LOWER and tt_score >= beta) or \
+                   (tt_flag == UPPER and tt_score <= alpha):
+                    return tt_score
+
+        color = board.next_player
+        history = self.history
+        moves = board.staged_moves(color, tt_move, self.killers[ply],
+                                   lambda pm: history.get((color, pm[1].code), 0))
+
+        alpha_orig = alpha
+        best, best_move = -INFINITY, 0
+        for piece, move in moves:
+            undo = board.make_move(piece, move)
+            score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move(undo)
+            if self.stopped:
+                return 0.0
+            if score > best:
+                best, best_move = score, move.encode()
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if undo.captured is None:
+                    self._update_quiet(color, move, depth, ply)
+                break
+        if best == -INFINITY:
+            # no legal move
+            return -MATE + ply if board.is_in_check(color) else 0.0
+
+        flag = UPPER if best <= alpha_orig else LOWER if best >= beta else EXACT
+        self.tt.store(key, depth, score_to_tt(best, ply), flag, best_move)
+        return best
+
+    def _quiescence(self, board, alpha, beta, ply):
+        if self._limits_hit():
+            return 0.0
+        self.nodes += 1
+        stand_pat = evaluate(board)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        for piece, move in board.staged_moves(board.next_player, quiets=False):
+            undo = board.make_move(piece, move)
+            score = -self._quiescence(board, -beta, -alpha, ply + 1)
+            board.unmake_move(undo)
+            if self.stopped:
+                return 0.0
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    # ==================== TABLEBASES ====================
+    def _tablebase_score(self, board, ply):
+        # exact score of a covered position, or None
+        found = self.tablebases.probe(board)
+        if found is None:
+            return None
+        result, plies = found
+        if result > 0:
+            return MATE - ply - plies
+        if result < 0:
+            return -MATE + ply + plies
+        return 0.0
+
+    def _tablebase_root(self, board, moves):
+        # (score, (piece, move)) of the best move when every reply is covered
+        if board.piece_count > MAX_PIECES or self.tablebases.probe(board) is None:
+            return None
+        best = None
+        for piece, move in moves:
+            undo = board.make_move(piece, move)
+            score = self._tablebase_score(board, 1)
+            board.unmake_move(undo)
+            if score is None:
+                return None
+            if best is None or -score > best[0]:
+                best = (-score, (piece, move))
+        return best
+
+    def _limits_hit(self):
+        # called once per node by negamax and quiescence; the limits
+        # themselves are looked at every CHECK_EVERY calls
+        if self.stopped:
+            return True
+        if self.abort:
+            self.stopped = True
+        else:
+            self.countdown -= 1
+            if self.countdown <= 0:
+                self.countdown = CHECK_EVERY
+                self.stopped = self._check_limits()
+        return self.stopped
+
+    def _check_limits(self):
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            return True
+        return self.max_time is not None and time.perf_counter() - self.start >= self.max_time
+
+    # ==================== MOVE ORDERING ====================
+    # the order itself comes from Board.staged_moves: hash move, captures
+    # by MVV-LVA, killers, then quiets by history
+    def _update_quiet(self, color, move, depth, ply):
+        code = move.encode()
+        killers = self.killers[ply]
+        if killers[0] != code:
+            killers[1] = killers[0]
+            killers[0] = code
+        key = (color, code)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+
+def score_to_tt(score, ply):
+    # mate scores are stored relative to the node, not the root
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+def score_from_tt(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
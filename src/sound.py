@@ -7,4 +7,17 @@ class Sound:
         self.sound = pygame.mixer.Sound(path)
 
     def play(self):
-        pygame.mixer.Sound.play(self.sound)
\ No newline at end of file
+        pygame.mixer.Sound.play(self.sound)
+
+
+class MoveSounds:
+
+    def __init__(self, move_sound, capture_sound):
+        # preloaded Sound objects, played by Board.move through the observer hook
+        self.move_sound = move_sound
+        self.capture_sound = capture_sound
+
+    def on_move(self, board, piece, move, captured):
+        sound = self.move_sound if captured is None else self.capture_sound
+        if sound is not None:
+            sound.play()
@@ -1,17 +1,28 @@
 
 class Square:
 
-    ALPHACOLS = {0: 'a', 1: 'b', 2: 'c', 3: 'd', 4: 'e', 5: 'f', 6: 'g', 7: 'h'}
+    __slots__ = ('row', 'col', 'piece')
 
     def __init__(self, row, col, piece=None):
         self.row = row
         self.col = col
         self.piece = piece
-        self.alphacol = self.ALPHACOLS[col]
+
+    @property
+    def alphacol(self):
+        return 'abcdefgh'[self.col]
 
     def __eq__(self, other):
         return self.row == other.row and self.col == other.col
 
+    def __hash__(self):
+        return self.row * 8 + self.col
+
+    @staticmethod
+    def at(row, col):
+        # shared empty square used as a move coordinate; never give it a piece
+        return COORDINATES[row][col]
+
     def has_piece(self):
         return self.piece != None
 
@@ -27,15 +38,9 @@ class Square:
     def isempty_or_enemy(self, color):
         return self.isempty() or self.has_enemy_piece(color)
 
-    @staticmethod
-    def in_range(*args):
-        for arg in args:
-            if arg < 0 or arg > 7:
-                return False
-        
-        return True
-
     @staticmethod
     def get_alphacol(col):
-        ALPHACOLS = {0: 'a', 1: 'b', 2: 'c', 3: 'd', 4: 'e', 5: 'f', 6: 'g', 7: 'h'}
-        return ALPHACOLS[col]
\ No newline at end of file
+        return 'abcdefgh'[col]
+
+
+COORDINATES = [[Square(row, col) for col in range(8)] for row in range(8)]
@@ -0,0 +1,599 @@
+"""
+Endgame tablebases for up to four pieces, built by retrograde analysis.
+
+    python src/tablebase.py build KQK KRK KPK     # missing sub-tables are built first
+    python src/tablebase.py build --all 3         # every 3-piece table
+    python src/tablebase.py probe --fen "8/8/8/4k3/8/8/8/KQ6 w - - 0 1"
+
+A table covers one material balance, named strong side first (KQKR:
+king and queen against king and rook), and stores one byte per index
+for both sides to move:
+
+    0 draw, 255 illegal position, n + 1 mate in n plies: a win for the
+    side to move when n is odd, a loss when n is even (0: mated).
+
+The index is perfect over placements: one of the eight board symmetries
+(only the file mirror when there are pawns) brings the strong king into
+the a1-d1-d4 triangle (files a-d), every other piece takes 64 squares.
+With the king on a1-d4 the smaller of the two transposes is used, so
+every orientation of a position has the same index.
+Files are opened with mmap, so probing reads only the pages it needs.
+Positions with castling rights or an en passant square are not covered,
+and distances count to mate, ignoring the fifty-move rule. Tables with
+pawns on both sides (KPKP) are not built: the generator has no en
+passant, and there it can be the only saving move.
+"""
+import argparse
+import itertools
+import mmap
+import os
+import sys
+import time
+from array import array
+
+from bitboard import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BIT, PIECE_TYPES, \
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, square_index, squares_of
+from const import TABLEBASE_DIR
+
+DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', TABLEBASE_DIR)
+
+DRAW, ILLEGAL = 0, 255
+MAX_PIECES = 4
+LETTERS = 'PNBRQK'          # by piece type
+ORDER = 'KQRBNP'            # strongest first, the order inside table names
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)
+# no mate is possible at all with these
+TRIVIAL_DRAWS = ('KK', 'KBK', 'KNK')
+
+
+# ==================== SYMMETRY ====================
+def _transform(sq, t):
+    file, rank = sq & 7, sq >> 3
+    if t & 1:
+        file = 7 - file
+    if t & 2:
+        rank = 7 - rank
+    if t & 4:
+        file, rank = rank, file
+    return rank * 8 + file
+
+TRANSFORMS = [[_transform(sq, t) for sq in range(64)] for t in range(8)]
+TRIANGLE = [sq for sq in range(64) if (sq >> 3) <= (sq & 7) <= 3]
+HALF = [sq for sq in range(64) if sq & 7 <= 3]
+# transform that brings a king on sq into the triangle
+TO_TRIANGLE = [next(t for t in range(8) if TRANSFORMS[t][sq] in TRIANGLE) for sq in range(64)]
+# a king on a1-d4 stays in the triangle when the board is transposed
+TRANSPOSE = TRANSFORMS[4]
+TRIANGLE_DIAGONAL = frozenset(sq for sq in TRIANGLE if sq & 7 == sq >> 3)
+
+
+# ==================== SLIDERS ====================
+# with four pieces on the board, walking the rays beats the bitboard
+# line attacks, and "is target hit" is one lookup of the squares between
+def _rays(sq, steps):
+    rays = []
+    for df, dr in steps:
+        file, rank, ray = (sq & 7) + df, (sq >> 3) + dr, []
+        while 0 <= file < 8 and 0 <= rank < 8:
+            ray.append(rank * 8 + file)
+            file, rank = file + df, rank + dr
+        rays.append(tuple(ray))
+    return tuple(rays)
+
+def _between(rays):
+    # {target: mask of the squares strictly between} per square
+    table = []
+    for sq_rays in rays:
+        lines = {}
+        for ray in sq_rays:
+            mask = 0
+            for to in ray:
+                lines[to] = mask
+                mask |= BIT[to]
+        table.append(lines)
+    return table
+
+STRAIGHT = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIAGONAL = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+RAYS = {BISHOP: [_rays(sq, DIAGONAL) for sq in range(64)],
+        ROOK: [_rays(sq, STRAIGHT) for sq in range(64)],
+        QUEEN: [_rays(sq, STRAIGHT + DIAGONAL) for sq in range(64)]}
+BETWEEN = {ptype: _between(rays) for ptype, rays in RAYS.items()}
+
+def slide(rays, occ):
+    # squares reached along rays, up to and including the first blocker
+    targets = 0
+    for ray in rays:
+        for to in ray:
+            targets |= BIT[to]
+            if occ & BIT[to]:
+                break
+    return targets
+
+
+# ==================== MATERIAL ====================
+def _side_name(types):
+    return 'K' + ''.join(sorted((LETTERS[t] for t in types if t != KING), key=ORDER.index))
+
+def _strength(name):
+    return len(name), tuple(-ORDER.index(ch) for ch in name)
+
+def table_name(pieces):
+    # (name, flipped) for [(color, ptype, sq)]: flipped when black is the strong side
+    white = _side_name([t for c, t, _ in pieces if c == WHITE])
+    black = _side_name([t for c, t, _ in pieces if c == BLACK])
+    if _strength(black) > _strength(white):
+        return black + white, True
+    return white + black, False
+
+def split_name(name):
+    i = name.index('K', 1)
+    return name[:i], name[i:]
+
+def supported(name):
+    # False for pawns on both sides, where en passant would be missing
+    strong, weak = split_name(name)
+    return not ('P' in strong and 'P' in weak)
+
+def dependencies(name):
+    # tables reached by one capture or promotion
+    strong, weak = split_name(name)
+    found = set()
+    for side, other, color in ((strong, weak, WHITE), (weak, strong, BLACK)):
+        for i, ch in enumerate(side[1:], 1):
+            rest = side[:i] + side[i + 1:]
+            names = [rest] + ([rest + p for p in 'QRBN'] if ch == 'P' else [])
+            for new in names:
+                types = [LETTERS.index(c) for c in new]
+                pieces = [(color, t, 0) for t in types] + [(color ^ 1, LETTERS.index(c), 0) for c in other]
+                dep, _ = table_name(pieces)
+                if dep not in TRIVIAL_DRAWS:
+                    found.add(dep)
+    return sorted(found, key=len)
+
+
+class Layout:
+    """
+    Piece order and index of one table: strong king, weak king, then
+    the other pieces of each side in name order.
+    """
+
+    def __init__(self, name):
+        strong, weak = split_name(name)
+        self.name = name
+        self.kinds = [(WHITE, KING), (BLACK, KING)] + \
+                     [(WHITE, LETTERS.index(ch)) for ch in strong[1:]] + \
+                     [(BLACK, LETTERS.index(ch)) for ch in weak[1:]]
+        self.pawns = 'P' in name
+        self.slots = HALF if self.pawns else TRIANGLE
+        self.slot_of = {sq: i for i, sq in enumerate(self.slots)}
+        self.others = len(self.kinds) - 1
+        self.size = 2 * len(self.slots) * 64 ** self.others
+
+    def index(self, squares, side):
+        # the same index for every orientation of a placement
+        king = squares[0]
+        if self.pawns:
+            if king & 7 > 3:
+                squares = [sq ^ 7 for sq in squares]
+        else:
+            t = TO_TRIANGLE[king]
+            if t:
+                table = TRANSFORMS[t]
+                squares = [table[sq] for sq in squares]
+            if squares[0] in TRIANGLE_DIAGONAL:
+                # both transposes are in the triangle: take the smaller
+                transposed = [TRANSPOSE[sq] for sq in squares]
+                if transposed < squares:
+                    squares = transposed
+        i = self.slot_of[squares[0]]
+        for sq in squares[1:]:
+            i = i * 64 + sq
+        return i * 2 + side
+
+    def decode(self, index):
+        index, side = divmod(index, 2)
+        squares = []
+        for _ in range(self.others):
+            index, sq = divmod(index, 64)
+            squares.append(sq)
+        squares.append(self.slots[index])
+        squares.reverse()
+        return squares, side
+
+    def order(self, pieces):
+        # squares in layout order from [(color, ptype, sq)] of this material
+        pool = list(pieces)
+        squares = []
+        for color, ptype in self.kinds:
+            for n, (c, t, sq) in enumerate(pool):
+                if c == color and t == ptype:
+                    squares.append(sq)
+                    del pool[n]
+                    break
+        return squares
+
+    # ==================== RULES ====================
+    def attacked(self, target, by, squares, occ, skip=-1):
+        # is target attacked by color by, ignoring the piece at index skip
+        bit = BIT[target]
+        for i, (color, ptype) in enumerate(self.kinds):
+            if color != by or i == skip:
+                continue
+            sq = squares[i]
+            if ptype == PAWN:
+                hit = PAWN_ATTACKS[color][sq] & bit
+            elif ptype == KNIGHT:
+                hit = KNIGHT_ATTACKS[sq] & bit
+            elif ptype == KING:
+                hit = KING_ATTACKS[sq] & bit
+            else:
+                line = BETWEEN[ptype][sq].get(target)
+                hit = line is not None and not line & occ
+            if hit:
+                return True
+        return False
+
+    def legal(self, squares, side):
+        # a placement that can occur with side to move
+        occ = 0
+        for sq in squares:
+            if occ & BIT[sq]:
+                return False
+            occ |= BIT[sq]
+        if KING_ATTACKS[squares[0]] & BIT[squares[1]]:
+            return False
+        for (color, ptype), sq in zip(self.kinds, squares):
+            if ptype == PAWN and (sq < 8 or sq >= 56):
+                return False
+        return not self.attacked(squares[side ^ 1], side, squares, occ)
+
+    def moves(self, squares, side):
+        # legal moves as (new squares, moved index, captured index or -1, promotion type or None)
+        kinds = self.kinds
+        occ = own = 0
+        for (color, _), sq in zip(kinds, squares):
+            occ |= BIT[sq]
+            if color == side:
+                own |= BIT[sq]
+        enemy = occ ^ own
+        found = []
+        for i, (color, ptype) in enumerate(kinds):
+            if color != side:
+                continue
+            sq = squares[i]
+            promotions = (None,)
+            if ptype == PAWN:
+                step = 8 if side == WHITE else -8
+                targets = PAWN_ATTACKS[side][sq] & enemy
+                if not occ & BIT[sq + step]:
+                    targets |= BIT[sq + step]
+                    if (sq >> 3) == (1 if side == WHITE else 6) and not occ & BIT[sq + 2 * step]:
+                        targets |= BIT[sq + 2 * step]
+                if (sq + step) >> 3 in (0, 7):
+                    promotions = PROMOTIONS
+            elif ptype == KNIGHT:
+                targets = KNIGHT_ATTACKS[sq] & ~own
+            elif ptype == KING:
+                targets = KING_ATTACKS[sq] & ~own
+            else:
+                targets = slide(RAYS[ptype][sq], occ) & ~own
+
+            for to in squares_of(targets):
+                captured = squares.index(to) if enemy & BIT[to] else -1
+                new = list(squares)
+                new[i] = to
+                king = to if ptype == KING else squares[side]
+                if self.attacked(king, side ^ 1, new, occ ^ BIT[sq] | BIT[to], captured):
+                    continue
+                for promotion in promotions:
+                    found.append((new, i, captured, promotion))
+        return found
+
+    def unmoves(self, squares, side):
+        # placements one move earlier, the other side to move; no
+        # captures or promotions, which would be another table
+        mover = side ^ 1
+        occ = 0
+        for sq in squares:
+            occ |= BIT[sq]
+        empty = ~occ
+        found = []
+        for i, (color, ptype) in enumerate(self.kinds):
+            if color != mover:
+                continue
+            sq = squares[i]
+            if ptype == PAWN:
+                back = -8 if mover == WHITE else 8
+                origins = 0
+                one = sq + back
+                if 8 <= one < 56 and empty & BIT[one]:
+                    origins = BIT[one]
+                    if (sq >> 3) == (3 if mover == WHITE else 4) and empty & BIT[one + back]:
+                        origins |= BIT[one + back]
+            elif ptype == KNIGHT:
+                origins = KNIGHT_ATTACKS[sq] & empty
+            elif ptype == KING:
+                origins = KING_ATTACKS[sq] & empty
+            else:
+                origins = slide(RAYS[ptype][sq], occ) & empty
+            rest = occ ^ BIT[sq]
+            for origin in squares_of(origins):
+                new = list(squares)
+                new[i] = origin
+                # origins are empty squares and pawns stay off the back
+                # ranks, so only the king of side can make it illegal
+                if not self.attacked(new[side], mover, new, rest | BIT[origin]):
+                    found.append(new)
+        return found
+
+
+# ==================== PROBING ====================
+def decode_value(value):
+    # (1 win, 0 draw, -1 loss, plies to mate or None) for the side to move
+    if value == DRAW or value == ILLEGAL:
+        return 0, None
+    plies = value - 1
+    return (1 if plies % 2 else -1), plies
+
+
+def _en_passant(board):
+    # can the pawn that just moved two squares be taken en passant
+    ep = board.en_passant_square
+    if ep is None:
+        return False
+    for col in (ep.col - 1, ep.col + 1):
+        if 0 <= col < 8:
+            piece = board.squares[ep.row][col].piece
+            if piece is not None and piece.name == 'pawn' and piece.color != ep.piece.color:
+                return True
+    return False
+
+
+class Tablebases:
+    """
+    Tables of one directory, each mapped on first use. probe(board)
+    returns (result, plies to mate) for the side to move, or None when
+    the position is not covered.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.tables = {}
+        self.layouts = {}
+
+    def path(self, name):
+        return os.path.join(self.directory, name + '.tb')
+
+    def table(self, name):
+        if name not in self.tables:
+            data = None
+            try:
+                with open(self.path(name), 'rb') as f:
+                    if os.fstat(f.fileno()).st_size == self.layout(name).size:
+                        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                pass
+            self.tables[name] = data
+        return self.tables[name]
+
+    def layout(self, name):
+        layout = self.layouts.get(name)
+        if layout is None:
+            layout = self.layouts[name] = Layout(name)
+        return layout
+
+    def close(self):
+        for data in self.tables.values():
+            if data is not None:
+                data.close()
+        self.tables = {}
+
+    def value(self, pieces, side):
+        # raw table byte for [(color, ptype, sq)] with side to move, or None
+        if len(pieces) > MAX_PIECES:
+            return None
+        name, flipped = table_name(pieces)
+        if name in TRIVIAL_DRAWS:
+            return DRAW
+        if not supported(name):
+            return None
+        data = self.table(name)
+        if data is None:
+            return None
+        if flipped:
+            pieces = [(color ^ 1, ptype, sq ^ 56) for color, ptype, sq in pieces]
+            side ^= 1
+        layout = self.layout(name)
+        return data[layout.index(layout.order(pieces), side)]
+
+    def probe(self, board):
+        if board.piece_count > MAX_PIECES or board.castling_rights() or _en_passant(board):
+            return None
+        pieces = []
+        for row in range(8):
+            for col in range(8):
+                piece = board.squares[row][col].piece
+                if piece is not None:
+                    pieces.append((WHITE if piece.color == 'white' else BLACK,
+                                   PIECE_TYPES[piece.name], square_index(row, col)))
+        value = self.value(pieces, WHITE if board.next_player == 'white' else BLACK)
+        if value is None or value == ILLEGAL:
+            return None
+        return decode_value(value)
+
+
+# ==================== GENERATION ====================
+def generate(name, tablebases, log=print):
+    # table bytes for name by retrograde analysis; sub-tables must exist
+    layout = Layout(name)
+    size = layout.size
+    values = bytearray(size)
+    pending = bytearray(size)       # undecided legal positions
+    children = bytearray(size)      # in-table successors not yet known to win
+    exit_win = bytearray(b'\xff') * size    # shortest win through a capture or promotion
+    loss = bytearray(size)          # longest loss among the decided successors
+    can_draw = bytearray(size)
+    buckets = [array('L') for _ in range(256)]
+    start = time.perf_counter()
+
+    # pass 1: every position, its moves and what the exits are worth;
+    # placements whose transpose has the smaller index copy it at the end
+    index = -1
+    aliases = []
+    for slot in layout.slots:
+        for rest in itertools.product(range(64), repeat=layout.others):
+            squares = [slot, *rest]
+            for side in (WHITE, BLACK):
+                index += 1
+                if not layout.legal(squares, side):
+                    values[index] = ILLEGAL
+                    continue
+                if slot in TRIANGLE_DIAGONAL and not layout.pawns:
+                    canonical = layout.index(squares, side)
+                    if canonical != index:
+                        aliases.append((index, canonical))
+                        continue
+                moves = layout.moves(squares, side)
+                if not moves:
+                    if layout.attacked(squares[side], side ^ 1, squares, sum(BIT[sq] for sq in squares)):
+                        buckets[0].append(index)
+                        pending[index] = 1
+                    continue
+                inside = set()
+                for new, moved, captured, promotion in moves:
+                    if captured < 0 and promotion is None:
+                        inside.add(layout.index(new, side ^ 1))
+                        continue
+                    pieces = [(color, promotion if i == moved and promotion is not None else ptype, new[i])
+                              for i, (color, ptype) in enumerate(layout.kinds) if i != captured]
+                    value = tablebases.value(pieces, side ^ 1)
+                    if value is None:
+                        raise RuntimeError(f'{name} needs {table_name(pieces)[0]}, build it first')
+                    result, plies = decode_value(value)
+                    if result < 0:
+                        exit_win[index] = min(exit_win[index], plies + 1)
+                    elif result > 0:
+                        loss[index] = max(loss[index], plies + 1)
+                    else:
+                        can_draw[index] = 1
+                children[index] = len(inside)
+                pending[index] = 1
+                if exit_win[index] != 255:
+                    buckets[exit_win[index]].append(index)
+                elif not inside and not can_draw[index]:
+                    buckets[loss[index]].append(index)
+    log(f'{name}: {size} indices, moves generated in {time.perf_counter() - start:.1f} s')
+
+    # pass 2: by increasing distance; parity tells wins (odd) from losses (even)
+    for plies in range(255):
+        for index in buckets[plies]:
+            if not pending[index]:
+                continue
+            pending[index] = 0
+            values[index] = plies + 1
+            squares, side = layout.decode(index)
+            seen = set()
+            # the index is symmetric, so the unmoves of this one
+            # orientation reach every predecessor
+            for previous in layout.unmoves(squares, side):
+                q = layout.index(previous, side ^ 1)
+                if q in seen or not pending[q]:
+                    continue
+                seen.add(q)
+                if plies % 2 == 0:
+                    buckets[plies + 1].append(q)
+                else:
+                    children[q] -= 1
+                    loss[q] = max(loss[q], plies + 1)
+                    if children[q] == 0 and exit_win[q] == 255 and not can_draw[q]:
+                        buckets[loss[q]].append(q)
+        buckets[plies] = None
+    for index, canonical in aliases:
+        values[index] = values[canonical]
+    log(f'{name}: done in {time.perf_counter() - start:.1f} s')
+    return values
+
+def build(names, directory, log=print):
+    # builds the named tables and the ones they depend on, if missing
+    os.makedirs(directory, exist_ok=True)
+    tablebases = Tablebases(directory)
+    done = []
+
+    def make(name):
+        if name in TRIVIAL_DRAWS or name in done:
+            return
+        if not supported(name):
+            raise ValueError(f'{name}: tables with pawns on both sides are not supported')
+        for dep in dependencies(name):
+            make(dep)
+        done.append(name)
+        if tablebases.table(name) is not None:
+            return
+        values = generate(name, tablebases, log)
+        path = tablebases.path(name)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(values)
+        os.replace(path + '.tmp', path)
+        tablebases.tables.pop(name, None)
+        counts = (sum(1 for v in values if v not in (DRAW, ILLEGAL) and (v - 1) % 2),
+                  sum(1 for v in values if v == DRAW),
+                  sum(1 for v in values if v not in (DRAW, ILLEGAL) and not (v - 1) % 2))
+        longest = max((v - 1 for v in values if v != ILLEGAL and v != DRAW), default=0)
+        log(f'{name}: {counts[0]} wins, {counts[1]} draws, {counts[2]} losses, longest mate {longest} plies')
+
+    for name in names:
+        make(name)
+    tablebases.close()
+    return done
+
+def all_names(pieces):
+    # every table with this many pieces
+    names = set()
+    for count in range(pieces - 2 + 1):
+        for strong in itertools.combinations_with_replacement('QRBNP', count):
+            for weak in itertools.combinations_with_replacement('QRBNP', pieces - 2 - count):
+                types = [(WHITE, LETTERS.index(ch), 0) for ch in 'K' + ''.join(strong)] + \
+                        [(BLACK, LETTERS.index(ch), 0) for ch in 'K' + ''.join(weak)]
+                name, _ = table_name(types)
+                if name not in TRIVIAL_DRAWS and supported(name):
+                    names.add(name)
+    return sorted(names)
+
+
+def main(argv=None):
+    from board import Board
+
+    parser = argparse.ArgumentParser(description='Endgame tablebase generator and probe.')
+    parser.add_argument('-d', '--directory', default=DIRECTORY)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    b = sub.add_parser('build', help='generate tables (and the tables they need)')
+    b.add_argument('names', nargs='*', help='tables such as KQK KRK KPK KBNK')
+    b.add_argument('--all', type=int, choices=(3, 4), help='every table with this many pieces')
+
+    p = sub.add_parser('probe', help='look a position up')
+    p.add_argument('--fen', required=True)
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        names = [name.upper() for name in args.names] + (all_names(args.all) if args.all else [])
+        if not names:
+            parser.error('name some tables or use --all')
+        for name in names:
+            if not supported(name):
+                parser.error(f'{name}: tables with pawns on both sides are not supported')
+        build(names, args.directory)
+    else:
+        tablebases = Tablebases(args.directory)
+        result = tablebases.probe(Board.from_fen(args.fen))
+        if result is None:
+            print('not in the tablebases')
+        else:
+            outcome, plies = result
+            print({1: 'win', 0: 'draw', -1: 'loss'}[outcome] + (f', mate in {plies} plies' if plies is not None else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Headless self-play tournament between two engine configurations.
+
+    python src/tournament.py -n 100 -a depth=3 -b time=0.05 --workers 8 --pgn games.pgn
+
+A player spec is a comma separated list of search limits:
+depth=N, nodes=N, time=SECONDS (per move) and hash=MB.
+Games are played in pairs from the same (optionally randomized)
+opening with colors swapped.
+"""
+import argparse
+import math
+import multiprocessing
+import random
+import sys
+import time
+from datetime import date
+
+from gamestate import GameState
+from search import Search
+
+
+TERMINATIONS = {
+    'stalemate': 'stalemate',
+    'threefold': 'threefold repetition',
+    'fifty-move': 'fifty-move rule',
+    'insufficient': 'insufficient material',
+}
+
+
+def parse_player(spec, default_time=None):
+    limits = {'max_depth': 64, 'max_nodes': None, 'max_time': default_time, 'hash_mb': 4}
+    names = {'depth': 'max_depth', 'nodes': 'max_nodes', 'time': 'max_time', 'hash': 'hash_mb'}
+    for item in filter(None, spec.split(',')):
+        key, _, value = item.partition('=')
+        if key not in names:
+            raise ValueError(f'unknown player option {key!r} in {spec!r}')
+        limits[names[key]] = float(value) if key == 'time' else int(value)
+    if limits['max_time'] is None and limits['max_nodes'] is None and limits['max_depth'] == 64:
+        raise ValueError(f'player {spec!r} needs a depth, nodes or time limit')
+    return limits
+
+
+# ==================== ONE GAME ====================
+def play_game(job):
+    # runs in a worker process; returns the result and the PGN text
+    index, white, black, opening_seed, random_plies, max_plies = job
+    game = GameState()
+    board = game.board
+    players = {'white': Search(**white[1]), 'black': Search(**black[1])}
+    start = time.perf_counter()
+
+    rng = random.Random(opening_seed)
+    while len(game.sans) < max_plies and not game.game_over:
+        if len(game.sans) < random_plies:
+            piece, move = rng.choice(board.legal_moves(game.next_player))
+        else:
+            piece, move = players[game.next_player].run(board)
+        game.play_move(piece, move)
+
+    if game.winner:
+        result, termination = ('1-0' if game.winner == 'white' else '0-1'), 'checkmate'
+    elif game.game_over:
+        result, termination = '1/2-1/2', TERMINATIONS[game.termination]
+    else:
+        result, termination = '1/2-1/2', 'adjudicated: ply limit'
+
+    tags = {
+        'Event': 'Engine tournament',
+        'Site': 'local',
+        'Date': date.today().strftime('%Y.%m.%d'),
+        'Round': str(index + 1),
+        'White': white[0],
+        'Black': black[0],
+        'Termination': termination,
+        'PlyCount': str(len(game.sans)),
+    }
+    return {
+        'index': index,
+        'white': white[0],
+        'black': black[0],
+        'result': result,
+        'plies': len(game.sans),
+        'seconds': time.perf_counter() - start,
+        'pgn': game.pgn(tags, result),
+    }
+
+
+# ==================== STATISTICS ====================
+def elo_difference(score):
+    if score <= 0.0:
+        return -math.inf
+    if score >= 1.0:
+        return math.inf
+    # + 0.0 turns the -0.0 of an even score into 0.0, printed as +0
+    return -400.0 * math.log10(1.0 / score - 1.0) + 0.0
+
+def summarize(wins, draws, losses):
+    # score, Elo difference and 95% margin from the first player's point of view;
+    # the margin is infinite when an end of the interval reaches 0% or 100%
+    games = wins + draws + losses
+    score = (wins + 0.5 * draws) / games
+    if score <= 0.0 or score >= 1.0:
+        return score, elo_difference(score), math.inf
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    low, high = elo_difference(max(score - margin, 0.0)), elo_difference(min(score + margin, 1.0))
+    return score, elo_difference(score), (high - low) / 2
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless engine vs engine tournament.')
+    parser.add_argument('-n', '--games', type=int, default=10)
+    parser.add_argument('-a', '--first', default='depth=2', help='first player spec')
+    parser.add_argument('-b', '--second', default='depth=2', help='second player spec')
+    parser.add_argument('--time', type=float, help='default seconds per move for both players')
+    parser.add_argument('--random-plies', type=int, default=4, help='random opening plies')
+    parser.add_argument('--max-plies', type=int, default=300, help='adjudicate a draw after this many plies')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-w', '--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--pgn', metavar='FILE', help='write every game to this PGN file')
+    args = parser.parse_args(argv)
+
+    first = ('A ' + args.first, parse_player(args.first, args.time))
+    second = ('B ' + args.second, parse_player(args.second, args.time))
+    jobs = []
+    for index in range(args.games):
+        pair, swapped = divmod(index, 2)
+        white, black = (second, first) if swapped else (first, second)
+        jobs.append((index, white, black, args.seed * 100003 + pair, args.random_plies, args.max_plies))
+
+    wins = draws = losses = plies = 0
+    pgn_file = open(args.pgn, 'w') if args.pgn else None
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.workers) as pool:
+        for done, game in enumerate(pool.imap_unordered(play_game, jobs), 1):
+            first_is_white = game['white'] == first[0]
+            if game['result'] == '1/2-1/2':
+                draws += 1
+            elif (game['result'] == '1-0') == first_is_white:
+                wins += 1
+            else:
+                losses += 1
+            plies += game['plies']
+            if pgn_file:
+                pgn_file.write(game['pgn'] + '\n')
+            print(f"game {game['index'] + 1:>4}: {game['white']} - {game['black']}  {game['result']:7}  "
+                  f"{game['plies']:>3} plies  {game['seconds']:6.1f} s   "
+                  f"[{done}/{args.games}]  +{wins} ={draws} -{losses}")
+    elapsed = time.perf_counter() - start
+    if pgn_file:
+        pgn_file.close()
+
+    score, elo, margin = summarize(wins, draws, losses)
+    bound = 'unbounded' if math.isinf(margin) else f'{margin:.0f}'
+    print(f'\n{first[0]} vs {second[0]}: +{wins} ={draws} -{losses}  '
+          f'score {score:.1%}  Elo {elo:+.0f} +/- {bound}')
+    print(f'{args.games} games, {plies} plies in {elapsed:.1f} s with {args.workers} workers: '
+          f'{args.games / elapsed:.2f} games/s, {plies / elapsed:.1f} plies/s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
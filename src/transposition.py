@@ -0,0 +1,224 @@
+from array import array
+from multiprocessing import shared_memory
+
+#Bound types (0 marks an empty slot)
+EXACT, LOWER, UPPER = 1, 2, 3
+
+SCORE_SCALE = 1000          # scores are stored as integer millipawns
+SCORE_OFFSET = 1 << 31
+ENTRY_BYTES = 16            # one key word and one data word per slot
+GENERATION_SHIFT = 58
+GENERATIONS = 64            # search generations before the counter wraps
+
+
+def pack(move, depth, flag, score, generation=0):
+    # data word: move (16) | depth (8) | flag (2) | score (32) | generation (6)
+    return (move | (depth << 16) | (flag << 24)
+            | ((int(round(score * SCORE_SCALE)) + SCORE_OFFSET) << 26)
+            | (generation << GENERATION_SHIFT))
+
+def unpack(data):
+    return ((data >> 16) & 0xFF, (((data >> 26) & 0xFFFFFFFF) - SCORE_OFFSET) / SCORE_SCALE,
+            (data >> 24) & 3, data & 0xFFFF)
+
+
+def _buckets(mb):
+    # power of two bucket count fitting in mb
+    slots = max(2, mb * 1024 * 1024 // ENTRY_BYTES)
+    buckets = 1
+    while buckets * 4 <= slots:
+        buckets *= 2
+    return buckets
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results keyed by Board.key().
+    Each bucket holds two slots: the first keeps the deepest result of
+    the current search generation, the second is always replaced. An
+    entry left by an earlier search (new_search() at every root) gives
+    up the first slot whatever its depth.
+    """
+
+    def __init__(self, mb=16):
+        buckets = _buckets(mb)
+        self.mask = buckets - 1
+        self.keys = array('Q', bytes(8 * 2 * buckets))
+        self.data = array('Q', bytes(8 * 2 * buckets))
+        self.generation = 0
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def size_mb(self):
+        return len(self.keys) * ENTRY_BYTES / (1024 * 1024)
+
+    def clear(self):
+        self.keys = array('Q', bytes(8 * len(self.keys)))
+        self.data = array('Q', bytes(8 * len(self.data)))
+        self.reset_stats()
+
+    def new_search(self):
+        self.generation = (self.generation + 1) % GENERATIONS
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            'size_mb': self.size_mb(),
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+            'hit_rate': self.hits / probes if probes else 0.0,
+            'hashfull': self.hashfull(),
+        }
+
+    def hashfull(self):
+        # permille of the first 1000 slots in use
+        sample = min(1000, len(self.data))
+        used = sum(1 for i in range(sample) if self.data[i])
+        return used * 1000 // sample
+
+    # ==================== PROBE / STORE ====================
+    def probe(self, key):
+        # (depth, score, flag, move) or None
+        slot = (key & self.mask) << 1
+        keys = self.keys
+        for i in (slot, slot + 1):
+            if keys[i] == key and self.data[i]:
+                self.hits += 1
+                return unpack(self.data[i])
+        self.misses += 1
+        if self.data[slot] or self.data[slot + 1]:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, score, flag, move=0):
+        slot = (key & self.mask) << 1
+        keys, data = self.keys, self.data
+        generation = self.generation
+        self.stores += 1
+
+        first = data[slot]
+        if keys[slot] == key or not first or depth >= (first >> 16) & 0xFF \
+                or first >> GENERATION_SHIFT != generation:
+            # depth-preferred slot; demote its previous occupant
+            if data[slot] and keys[slot] != key:
+                self.overwrites += data[slot + 1] != 0
+                keys[slot + 1], data[slot + 1] = keys[slot], data[slot]
+            elif keys[slot] == key and not move:
+                move = data[slot] & 0xFFFF
+            i = slot
+        else:
+            i = slot + 1
+            if data[i] and keys[i] != key:
+                self.overwrites += 1
+            elif keys[i] == key and not move:
+                move = data[i] & 0xFFFF
+        keys[i] = key
+        data[i] = pack(move, min(depth, 255), flag, score, generation)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    The same table in a multiprocessing.shared_memory block, probed and
+    stored by several processes without locks. A slot keeps key ^ data
+    in its key word, so a slot torn by two processes writing at once
+    fails the key check and reads as a miss. The creating process owns
+    the block and its search generation (one more word after the
+    slots); its child processes attach with
+    SharedTranspositionTable(mb, name).
+    """
+
+    def __init__(self, mb=16, name=None):
+        buckets = _buckets(mb)
+        size = 2 * buckets * ENTRY_BYTES + 8
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.memory.name
+        self.mb = mb
+        self.mask = buckets - 1
+        self.words = self.memory.buf.cast('Q')
+        self.keys = self.words[:2 * buckets]
+        self.data = self.words[2 * buckets:4 * buckets]
+        self.generation_word = 4 * buckets
+        self.reset_stats()
+
+    @property
+    def generation(self):
+        return self.words[self.generation_word]
+
+    def new_search(self):
+        # the attached processes search the owner's roots
+        if self.owner:
+            self.words[self.generation_word] = (self.generation + 1) % GENERATIONS
+
+    def clear(self):
+        self.memory.buf[:] = bytes(len(self.memory.buf))
+        self.reset_stats()
+
+    def close(self):
+        # releases this process's view; the creator also frees the block
+        if self.words is None:
+            return
+        for view in (self.keys, self.data, self.words):
+            view.release()
+        self.keys = self.data = self.words = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    # ==================== PROBE / STORE ====================
+    def probe(self, key):
+        slot = (key & self.mask) << 1
+        keys, data = self.keys, self.data
+        for i in (slot, slot + 1):
+            entry = data[i]
+            if entry and keys[i] ^ entry == key:
+                self.hits += 1
+                return unpack(entry)
+        self.misses += 1
+        if data[slot] or data[slot + 1]:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, score, flag, move=0):
+        slot = (key & self.mask) << 1
+        keys, data = self.keys, self.data
+        generation = self.generation
+        self.stores += 1
+
+        first = data[slot]
+        first_key = keys[slot] ^ first
+        if first_key == key or not first or depth >= (first >> 16) & 0xFF \
+                or first >> GENERATION_SHIFT != generation:
+            if first and first_key != key:
+                self.overwrites += data[slot + 1] != 0
+                keys[slot + 1], data[slot + 1] = first_key ^ first, first
+            elif first_key == key and not move:
+                move = first & 0xFFFF
+            i = slot
+        else:
+            i = slot + 1
+            second = data[i]
+            if second and keys[i] ^ second != key:
+                self.overwrites += 1
+            elif keys[i] ^ second == key and not move:
+                move = second & 0xFFFF
+        entry = pack(move, min(depth, 255), flag, score, generation)
+        data[i] = entry
+        keys[i] = key ^ entry
@@ -0,0 +1,20 @@
+class Undo:
+
+    def __init__(self, piece, move, last_move, en_passant_square, key):
+        # everything Board.unmake_move needs to restore the position
+        self.piece = piece
+        self.move = move
+        self.last_move = last_move
+        self.en_passant_square = en_passant_square
+        self.key = key
+        self.moved = piece.moved
+        self.captured = None
+        self.captured_square = None
+        self.rook = None
+        self.rook_initial = None
+        self.rook_final = None
+        self.rook_moved = False
+        self.halfmove = 0
+        self.fullmove = 1
+        self.eval = None    # (material, midgame, endgame, phase) before the move
+        self.key_counts = None  # repetition counts replaced by an irreversible move
@@ -0,0 +1,12 @@
+import random
+
+#Zobrist keys, indexed like the bitboard core: PIECE_KEYS[piece_index][square_index]
+_rng = random.Random(0x5A0B)
+
+def _key():
+    return _rng.getrandbits(64)
+
+PIECE_KEYS = [[_key() for _ in range(64)] for _ in range(12)]
+CASTLING_KEYS = [_key() for _ in range(16)]
+EN_PASSANT_KEYS = [_key() for _ in range(8)]
+SIDE_KEY = _key()
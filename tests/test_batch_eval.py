@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from board import Board
+from evaluation import incremental_score
+
+np = pytest.importorskip('numpy')
+import batch_eval
+
+
+def random_boards(count, seed=7, max_plies=80):
+    # one board per ply of random games
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = Board()
+        for _ in range(max_plies):
+            moves = board.legal_moves(board.next_player)
+            if not moves or len(boards) >= count:
+                break
+            board.move(*rng.choice(moves), testing=True)
+            boards.append(Board.from_fen(board.to_fen()))
+    return boards
+
+
+@pytest.fixture(scope='module')
+def boards():
+    return random_boards(300)
+
+
+def test_batch_matches_reference(boards):
+    codes = np.array([b.square_codes() for b in boards], dtype=np.int8)
+    reference = [batch_eval.evaluate_reference(c) for c in codes.tolist()]
+    assert np.abs(batch_eval.evaluate_batch(codes) - reference).max() < 1e-9
+
+
+def test_batch_matches_planes(boards):
+    codes = np.array([b.square_codes() for b in boards], dtype=np.int8)
+    planes = np.zeros((len(codes), 12, 64), dtype=np.int8)
+    for ptype in range(6):
+        planes[:, ptype] = codes == ptype + 1
+        planes[:, 6 + ptype] = codes == -(ptype + 1)
+    assert np.array_equal(batch_eval.evaluate_batch(planes), batch_eval.evaluate_batch(codes))
+
+
+def test_static_batch_matches_incremental_score(boards):
+    codes = np.array([b.square_codes() for b in boards], dtype=np.int8)
+    engine = [incremental_score(b.eval_material, b.eval_mg, b.eval_eg, b.eval_phase) for b in boards]
+    assert np.abs(batch_eval.static_batch(codes) - engine).max() < 1e-6
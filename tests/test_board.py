@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from board import Board
+from position import Position
+from perft import POSITIONS
+import pgn
+
+
+@pytest.mark.parametrize('fen', [
+    '',
+    '4k3/8/8/8/8/8/4K3 w - - 0 1',              # 7 ranks
+    '4k3/8/8/8/8/8/8/8/4K3 w - - 0 1',          # 9 ranks
+    '4k3/8/8/8/8/8/8/4K3p w - - 0 1',           # 9 squares
+    '4k3/8/8/8/8/8/8/ppppKppppp w - - 0 1',     # 10 squares
+    '4k3/8/8/8/8/8/8/4K2 w - - 0 1',            # 7 squares
+    '4k3/8/8/8/8/8/8/3XK3 w - - 0 1',           # unknown piece
+])
+@pytest.mark.parametrize('cls', [Board, Position])
+def test_malformed_placement_is_rejected(cls, fen):
+    with pytest.raises(ValueError):
+        cls.from_fen(fen)
+
+
+def test_board_needs_both_kings():
+    with pytest.raises(ValueError):
+        Board.from_fen('8/8/8/8/8/8/8/4K3 w - - 0 1')
+
+
+def play(board, sans):
+    for _ in pgn.replay(sans, board):
+        pass
+    return board
+
+
+def test_knight_shuffle_is_threefold():
+    board = play(Board(), ['Nf3', 'Nf6', 'Ng1', 'Ng8'] * 2)
+    assert board.repetitions() == 3
+    assert board.check_game_over(board.next_player) == 'threefold'
+
+
+def test_twofold_is_not_a_draw():
+    board = play(Board(), ['Nf3', 'Nf6', 'Ng1', 'Ng8'])
+    assert board.repetitions() == 2
+    assert board.check_game_over(board.next_player) is None
+
+
+def test_hundred_halfmoves_is_fifty_move_draw():
+    board = Board.from_fen('4k3/8/8/8/8/8/8/R3K3 w - - 99 80')
+    assert board.check_game_over('white') is None
+    play(board, ['Ra2'])
+    assert board.halfmove == 100
+    assert board.check_game_over('black') == 'fifty-move'
+
+
+@pytest.mark.parametrize('fen, insufficient', [
+    ('4k3/8/8/8/8/8/8/4K3 w - - 0 1', True),
+    ('4k3/8/8/8/8/8/8/2N1K3 w - - 0 1', True),
+    ('4k3/8/8/8/8/8/3b4/2B1K3 w - - 0 1', True),       # bishops on dark squares
+    ('4k3/8/8/8/8/8/4b3/2B1K3 w - - 0 1', False),      # opposite colors
+    ('4k3/8/8/8/8/8/8/1NB1K3 w - - 0 1', False),
+    ('4k3/8/8/8/8/8/4P3/4K3 w - - 0 1', False),
+])
+def test_insufficient_material(fen, insufficient):
+    board = Board.from_fen(fen)
+    assert board.insufficient_material() is insufficient
+    assert (board.check_game_over('white') == 'insufficient') is insufficient
+
+
+def snapshot(board):
+    return (board.to_fen(), board.zobrist_key, board.compute_key(),
+            (board.eval_material, board.eval_mg, board.eval_eg, board.eval_phase),
+            dict(board.key_counts), board.piece_count)
+
+
+@pytest.mark.parametrize('name', ['startpos', 'kiwipete', 'position3', 'position4', 'position5'])
+def test_unmake_restores_every_move(monkeypatch, name):
+    # random games with the debug checks on; every legal move is made and
+    # unmade along the way and must leave the board as it was
+    monkeypatch.setattr(Board, 'debug', True)
+    rng = random.Random(name)
+    for _ in range(3):
+        board = Board.from_fen(POSITIONS[name][0])
+        for _ in range(60):
+            moves = board.legal_moves(board.next_player)
+            if not moves:
+                break
+            before = snapshot(board)
+            for piece, move in moves:
+                undo = board.make_move(piece, move)
+                board.unmake_move(undo)
+                assert snapshot(board) == before, (before[0], move.encode())
+            board.make_move(*rng.choice(moves))
@@ -0,0 +1,38 @@
+"""
+The perft suite of src/perft.py at shallow depths, as a regression gate
+for both move generators. The full depths stay in the CLI:
+
+    python src/perft.py
+"""
+import pytest
+
+from perft import POSITIONS, ENGINES, expected_nodes, load, board_perft, position_perft
+
+# deepest depth whose published count is checked here; keeps the run short
+MAX_NODES = 10000
+
+CASES = [(engine, name, depth)
+         for name, (_, counts, _) in POSITIONS.items()
+         for engine in ENGINES
+         for depth in sorted(counts)
+         if counts[depth] <= MAX_NODES]
+
+
+@pytest.mark.parametrize('engine, name, depth', CASES)
+def test_perft(engine, name, depth):
+    root = load(engine, POSITIONS[name][0])
+    perft = position_perft if engine == 'position' else board_perft
+    assert perft(root, depth) == expected_nodes(name, depth)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_every_position_is_covered(engine):
+    covered = {name for e, name, _ in CASES if e == engine}
+    assert covered == set(POSITIONS)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_promotions_are_covered(engine):
+    # depths whose trees hold promotions to every piece
+    covered = {(name, depth) for e, name, depth in CASES if e == engine}
+    assert {('position4', 3), ('position5', 2), ('underpromote-to-check', 3)} <= covered
@@ -0,0 +1,34 @@
+import pytest
+
+import pgn
+
+
+def replay_text(text):
+    (tags, sans, result), = pgn.read_games(text.splitlines())
+    board = pgn.start_board(tags)
+    for _ in pgn.replay(sans, board):
+        pass
+    return sans, result, board
+
+
+@pytest.mark.parametrize('white, black', [('O-O', '0-0'), ('0-0', 'O-O')])
+def test_castling_kingside_either_spelling(white, black):
+    sans, result, board = replay_text(
+        f'[Event "test"]\n\n1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. {white} Nf6\n5. d3 {black} 1-0\n')
+    assert sans[6] == white and sans[9] == black
+    assert result == '1-0'
+    assert board.to_fen().startswith('r1bq1rk1/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQ1RK1 w')
+
+
+@pytest.mark.parametrize('white, black', [('O-O-O', '0-0-0+'), ('0-0-0', 'O-O-O')])
+def test_castling_queenside_either_spelling(white, black):
+    sans, result, board = replay_text(
+        f'1. d4 d5 2. Nc3 Nc6 3. Bf4 Bf5 4. Qd2 Qd7 5. {white} {black} 0-1')
+    assert len(sans) == 10
+    assert result == '0-1'
+    assert board.to_fen().startswith('2kr1bnr/pppqpppp/2n5/3p1b2/3P1B2/2N5/PPPQPPPP/2KR1BNR w')
+
+
+def test_results_and_move_numbers_are_not_moves():
+    (_, sans, result), = pgn.read_games(['1. e4 0-1'])
+    assert sans == ['e4'] and result == '0-1'
@@ -0,0 +1,15 @@
+import pytest
+
+from board import Board
+from perft import POSITIONS
+from search import Search, CHECK_EVERY
+
+
+@pytest.mark.parametrize('name', ['startpos', 'kiwipete', 'position3', 'position4'])
+@pytest.mark.parametrize('budget', [500, 5000])
+def test_node_budget_is_kept(name, budget):
+    # quiescence nodes count towards the checks too, so the search stops
+    # within one check interval of the budget
+    search = Search(max_nodes=budget)
+    assert search.run(Board.from_fen(POSITIONS[name][0])) is not None
+    assert budget <= search.nodes < budget + CHECK_EVERY